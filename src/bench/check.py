@@ -0,0 +1,95 @@
+# python -m bench.check, from the src directory
+
+import json
+import os
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from timeit import repeat
+
+from bench.corpus import journal
+from journalparser import check
+
+# checking one journal, in process or answered by --check -, a one-off
+# compile.py --check misses it on startup alone, mostly importing pydantic
+TARGET_MS = 100
+CHAPTERS = (10, 50, 200)
+
+
+def in_process(path):
+    def run():
+        with open(path) as f:
+            list(check(f))
+
+    return min(repeat(run, number=1, repeat=5))
+
+
+def process(path):
+    timings = []
+
+    for _ in range(5):
+        start = perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "compile.py",
+                        "--check", path], check=True)
+        timings.append(perf_counter() - start)
+
+    return min(timings)
+
+
+def persistent(path):
+    # first answer with startup, then the fastest of the later ones
+    timings = []
+
+    with subprocess.Popen([sys.executable, "-W", "ignore", "compile.py",
+                           "--check", "-"], stdin=subprocess.PIPE,
+                          stdout=subprocess.PIPE, text=True) as p:
+        for _ in range(6):
+            start = perf_counter()
+            p.stdin.write(path + "\n")
+            p.stdin.flush()
+
+            # error lines until the one with the error count
+            while "errors" not in json.loads(p.stdout.readline()):
+                pass
+
+            timings.append(perf_counter() - start)
+
+        p.stdin.close()
+
+    return timings[0], min(timings[1:])
+
+
+def main():
+    with TemporaryDirectory() as tmp:
+        paths = []
+
+        for chapters in CHAPTERS:
+            path = os.path.join(tmp, f"chapters-{chapters}.journal")
+            with open(path, "w") as f:
+                f.write(journal(chapters=chapters))
+
+            paths.append(path)
+
+        for chapters, path in zip(CHAPTERS, paths):
+            seconds = in_process(path)
+            print(f"check, {chapters:3d} chapters:   "
+                  f"{seconds * 1000:8.1f} ms  ({verdict(seconds)})")
+
+        total = process(paths[0])
+        startup = total - in_process(paths[0])
+        first, answer = persistent(paths[0])
+
+    print(f"compile.py --check:    {total * 1000:8.1f} ms  ({verdict(total)},"
+          f" startup {startup * 1000:.1f} ms)")
+    print(f"compile.py --check -:  {answer * 1000:8.1f} ms"
+          f"  ({verdict(answer)}, first answer {first * 1000:.1f} ms)")
+    print(f"target:                {TARGET_MS:8d} ms per file")
+
+
+def verdict(seconds):
+    return "ok" if seconds * 1000 <= TARGET_MS else "over target"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# deterministic synthetic .journal documents
+
+import os
+from random import Random
+
+WORDS = ("journal", "python", "parser", "chapter", "gallery", "picture",
+         "render", "static", "html", "keyword", "topic", "article",
+         "content", "format", "validation", "component", "document",
+         "plain", "text", "river", "forest", "mountain", "garden", "elm")
+
+# https urls, so pictures and galleries validate without files on disk
+IMAGES = tuple(f"https://www.robingruenke.com/img/{w}.jpg" for w in WORDS[-6:])
+
+
+def corpus(directory, articles=20, chapters=10, paragraphs=5, seed=0):
+    paths = []
+
+    for n in range(articles):
+        path = os.path.join(directory, f"article-{n:04d}.journal")
+        with open(path, "w") as f:
+            f.write(journal(chapters, paragraphs, seed + n))
+
+        paths.append(path)
+
+    return paths
+
+
+def journal(chapters=10, paragraphs=5, seed=0):
+    rnd = Random(seed)
+    sl = [meta(rnd), "\n", introduction(rnd)]
+
+    for n in range(chapters):
+        sl.append("\n")
+        sl.append(chapter(rnd, n, paragraphs))
+
+    return "".join(sl)
+
+
+def meta(rnd):
+    keywords = rnd.sample(WORDS, 5)
+    return "".join([
+        "/meta\n",
+        "author: Robin Gruenke\n",
+        "website: https://www.robingruenke.com\n",
+        "year: 2021\n",
+        "title: ", sentence(rnd, 4, 6)[:40].ljust(30, "x"), "\n",
+        "description: ", sentence(rnd, 12, 16)[:150].ljust(60, "x"), "\n",
+        "keywords: ", " ".join(keywords), "\n",
+    ])
+
+
+def introduction(rnd):
+    return "".join([
+        "/introduction\n",
+        "\n",
+        sentence(rnd, 20, 40)[:550].ljust(60, "x"), "\n",
+    ])
+
+
+def chapter(rnd, n, paragraphs):
+    sl = [
+        "/chapter\n",
+        f"topic: Chapter {n} ", sentence(rnd, 2, 4)[:40], "\n",
+        "author: Robin Gruenke\n",
+        f"date: 2021-{n % 12 + 1:02d}-{n % 28 + 1:02d}\n",
+    ]
+
+    if rnd.random() < 0.3:
+        sl += ["picture: 250px ", rnd.choice(IMAGES), "\n"]
+
+        if rnd.random() < 0.5:
+            sl += ["gallery: 75px ", " ".join(
+                rnd.sample(IMAGES, rnd.randint(2, 5))), "\n"]
+
+    if rnd.random() < 0.2:
+        sl += ["quote: [Robin Gruenke] [", sentence(rnd, 4, 12),
+               "] https://en.wikipedia.org/wiki/Journal\n"]
+
+    for _ in range(paragraphs):
+        sl.append("\n")
+        if rnd.random() < 0.1:
+            sl += ["|code\n", "  ", sentence(rnd, 4, 8), "\n", "code|\n"]
+        else:
+            sl += [sentence(rnd, 20, 60), "\n"]
+
+    return "".join(sl)
+
+
+def sentence(rnd, mi, mx):
+    return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(mi, mx)))
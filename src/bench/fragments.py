@@ -0,0 +1,54 @@
+# python -m bench.fragments, from the src directory
+
+from timeit import repeat
+
+from yattag import Doc
+
+from render.html import fragments
+
+NUMBER = 2000
+
+VALUES = {
+    "description": "A synthetic journal article about rivers & forests",
+    "keywords": "river forest mountain garden elm",
+    "author": "Robin Gruenke",
+    "css": "body { margin: 0 }" * 200,
+    "title": "Synthetic article <number one>",
+    "copyright": "Copyright 2021-2026 Robin T. Gruenke",
+    "idparent": "synthetic-chapter-number-one",
+    "topic": "Synthetic chapter number one, about rivers & forests",
+    "scope": "Synthetic chapter number one, about...",
+}
+
+
+def yattag(fragment, values):
+    return timed(lambda doc: fragment.build(doc, **values))
+
+
+def precompiled(fragment, values):
+    fragment.render(**values)
+    return timed(lambda doc: fragment.emit(doc, **values))
+
+
+def timed(emit):
+    # one Doc per page, as in htmldocument
+    return min(repeat("emit(doc)", "doc = Doc()", number=NUMBER, repeat=5,
+                      globals={"emit": emit, "Doc": Doc})) / NUMBER
+
+
+def main():
+    print(f"{'fragment':18} {'yattag':>10} {'fragment':>10} {'speedup':>8}")
+
+    for name in ("HEAD", "HOME_FOOTER", "FEEDBACK_BUTTON", "FEEDBACK_FORM",
+                 "LIKE", "NEW_CHAPTER_HINT"):
+        fragment = getattr(fragments, name)
+        values = {slot: VALUES[slot] for slot in fragment.slots}
+        before = yattag(fragment, values)
+        after = precompiled(fragment, values)
+
+        print(f"{name:18} {before * 1e6:8.1f}us {after * 1e6:8.1f}us"
+              f" {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# python -m bench.lexer, from the src directory
+
+import os
+from tempfile import TemporaryDirectory
+from timeit import repeat
+
+from bench.corpus import journal
+from journalparser import _component_iterator, _component_iterator_seekable
+
+CHAPTERS = 2000
+
+
+def lex(iterate, path):
+    def run():
+        with open(path) as f:
+            for _ in iterate(f):
+                pass
+
+    return min(repeat(run, number=1, repeat=3))
+
+
+def main():
+    with TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.journal")
+        with open(path, "w") as f:
+            f.write(journal(chapters=CHAPTERS, paragraphs=8))
+
+        size = os.path.getsize(path) / 2 ** 20
+        seekable = lex(_component_iterator_seekable, path)
+        single_pass = lex(_component_iterator, path)
+
+    print(f"journal size:        {size:8.1f} MiB")
+    print(f"seekable iterator:   {seekable * 1000:8.1f} ms")
+    print(f"single-pass lexer:   {single_pass * 1000:8.1f} ms")
+    print(f"speedup:             {seekable / single_pass:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
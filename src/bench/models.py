@@ -0,0 +1,81 @@
+# python -m bench.models, from the src directory
+
+from timeit import repeat
+
+from journalparser import ParseComponent, is_url
+from model import Chapter, type_chapter_with_gallery_url
+from model import type_chapter_with_picture_url, type_with_appendix_filepath
+
+CHAPTERS = 200
+
+
+def chapter_tokens():
+    return {
+        "author": "Robin Gruenke",
+        "topic": "Preface: What about Elm ?",
+        "date": "2020-12-29",
+        "appendix": {
+            "description": "Sample picture",
+            "href": "gallery/sample.jpg"
+        },
+        "picture": {
+            "src": "https://www.robingruenke.com/img/sample.jpg",
+            "height": "250px"
+        },
+        "gallery": {
+            "height": "75px",
+            "items": [
+                "https://www.robingruenke.com/img/water.jpg",
+                "https://www.robingruenke.com/img/river.jpg",
+                "https://www.robingruenke.com/img/forest.jpg"
+            ]
+        },
+        "paragraphs": [
+            {"type": "text", "content": "A paragraph of the chapter."}
+        ]
+    }
+
+
+def parse_uncached(tokens):
+    Model = Chapter
+
+    if "appendix" in tokens and not is_url(tokens["appendix"]["href"]):
+        Model = type_with_appendix_filepath(Model)
+
+    if "gallery" in tokens and is_url(tokens["gallery"]["items"][0]):
+        Model = type_chapter_with_gallery_url(Model)
+
+    if "picture" in tokens and is_url(tokens["picture"]["src"]):
+        Model = type_chapter_with_picture_url(Model)
+
+    return Model(**tokens)
+
+
+def parse_cached(tokens, pc=ParseComponent()):
+    chapter, err = pc.parse_component_chapter(tokens)
+    assert err is None, err
+    return chapter
+
+
+def per_chapter_us(parse_chapter, tokens):
+    def run():
+        for _ in range(CHAPTERS):
+            parse_chapter(tokens)
+
+    best = min(repeat(run, number=1, repeat=5))
+    return best / CHAPTERS * 1e6
+
+
+def main():
+    tokens = chapter_tokens()
+    before = per_chapter_us(parse_uncached, tokens)
+    after = per_chapter_us(parse_cached, tokens)
+
+    print(f"chapters per run:      {CHAPTERS}")
+    print(f"before (new classes):  {before:9.1f} us/chapter")
+    print(f"after (registry):      {after:9.1f} us/chapter")
+    print(f"speedup:               {before / after:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# python -m bench.related [articles], from the src directory
+
+import sys
+from random import Random
+from time import perf_counter
+from types import SimpleNamespace
+
+from compile import Document, documents_valid_as_related, set_related_topics
+
+KEYWORDS = [f"keyword{n:03d}" for n in range(300)]
+# the all-pairs loop is quadratic, above this its time is extrapolated
+BASELINE_MAX = 2000
+
+
+def corpus(n, seed=0):
+    rnd = Random(seed)
+    docs = []
+
+    for i in range(n):
+        keywords = rnd.sample(KEYWORDS, 5)
+        meta = SimpleNamespace(title=f"Synthetic article number {i:05d}",
+                               keywords=" ".join(keywords), opt_out=None)
+        doc = Document(f"../journal/bench/article-{i}.journal", {},
+                       SimpleNamespace(meta=meta))
+        doc.recommended_keywords = [(k, 5) for k in keywords]
+        docs.append(doc)
+
+    return docs
+
+
+def set_related_topics_all_pairs(documents, verbose):
+    # set_related_topics before the inverted index
+    for document in documents_valid_as_related(documents):
+        rts = document.related_topics
+        append_topic = rts.append
+        sort_topics = rts.sort
+
+        for other_doc in documents_valid_as_related(documents):
+            if other_doc is document:
+                continue
+
+            mi = document.keywords_match_index(other_doc)
+            if mi <= 8:
+                append_topic(dict(
+                    match_index=mi,
+                    title=other_doc.content.meta.title,
+                    href=other_doc.href))
+
+        sort_topics(key=lambda t: t["match_index"])
+
+
+def timed(set_topics, docs):
+    start = perf_counter()
+    set_topics(docs, False)
+    return perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    m = min(n, BASELINE_MAX)
+
+    before_docs, check_docs = corpus(m), corpus(m)
+    before = timed(set_related_topics_all_pairs, before_docs) * (n / m) ** 2
+    timed(set_related_topics, check_docs)
+    after = timed(set_related_topics, corpus(n))
+
+    same = [d.related_topics for d in before_docs] == \
+        [d.related_topics for d in check_docs]
+    extrapolated = f" (extrapolated from {m})" if m < n else ""
+
+    print(f"articles:            {n}")
+    print(f"all pairs:           {before:8.2f} s{extrapolated}")
+    print(f"inverted index:      {after:8.2f} s")
+    print(f"speedup:             {before / after:8.1f}x")
+    print(f"identical output:    {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# python -m bench.statcache, from the src directory
+
+import os
+from tempfile import TemporaryDirectory
+from timeit import repeat
+from typing import List
+
+from pydantic import BaseModel, FilePath
+
+from model import Gallery, stat_cache
+
+PICTURES = 300
+CHAPTERS = 2000
+
+
+class GalleryFilePath(BaseModel):
+    # the validation WebRootFilePath did before the stat cache
+    height: str
+    items: List[FilePath]
+
+
+def galleries(n):
+    for i in range(n):
+        items = [f"gallery/{(i + k) % PICTURES}.jpg" for k in range(6)]
+        yield {"height": "75px", "items": items}
+
+
+def validate(Model, prefix="", warm=False):
+    def run():
+        stat_cache.clear()
+        if warm:
+            stat_cache.warm(os.pardir)
+
+        for g in galleries(CHAPTERS):
+            g["items"] = [prefix + item for item in g["items"]]
+            Model(**g)
+
+    return min(repeat(run, number=1, repeat=3))
+
+
+def main():
+    cwd = os.getcwd()
+
+    with TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "gallery"))
+        os.makedirs(os.path.join(root, "src"))
+        for i in range(PICTURES):
+            open(os.path.join(root, "gallery", f"{i}.jpg"), "w").close()
+
+        os.chdir(os.path.join(root, "src"))
+        try:
+            before = validate(GalleryFilePath, prefix="../")
+            after = validate(Gallery)
+            listings = len(stat_cache._listings)
+            warmed = validate(Gallery, warm=True)
+        finally:
+            os.chdir(cwd)
+
+    refs = CHAPTERS * 6
+    print(f"gallery references:  {refs}")
+    print(f"pydantic FilePath:   {before * 1000:8.1f} ms"
+          f"  ({refs * 2} stat calls)")
+    print(f"stat cache:          {after * 1000:8.1f} ms"
+          f"  ({listings} directory scans)")
+    print(f"stat cache, warmed:  {warmed * 1000:8.1f} ms")
+    print(f"speedup:             {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# python -m bench.suite run | compare BASELINE CURRENT, from the src directory
+# compare exits with 1 when a stage got slower than --threshold allows
+
+import json
+import os
+import platform
+import sys
+from argparse import ArgumentParser, Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from bench.corpus import corpus
+from compile import FEATURES, parse_documents, render, \
+    set_recommended_keywords, set_related_topics
+from journalparser import ParseComponent, TokenizeComponent, \
+    _component_iterator
+from render.html.context import INLINE_CSS, INLINE_CSS_AFTER_CRITICAL, \
+    RenderContext
+from render.html.skeleton import htmldocument
+from seo import SeoEngine
+
+STAGES = ("lex", "tokenize", "validate", "seo", "related", "render",
+          "write", "write unchanged")
+
+# faster stages are too noisy to flag
+MIN_SECONDS = 0.001
+
+
+def main():
+    args = cli_arguments()
+
+    if args.command == "run":
+        results = run(args.articles, args.chapters, args.paragraphs,
+                      args.seed, args.repeat)
+        print_results(results)
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+        regressions = compare(baseline, current, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+def run(articles=20, chapters=10, paragraphs=5, seed=0, repeat=3):
+    with TemporaryDirectory() as tmp:
+        journals = os.path.join(tmp, "journal")
+        os.mkdir(journals)
+
+        # Document expects a path relative to src, like ../journal/*.journal
+        files = [os.path.relpath(p) for p in corpus(
+            journals, articles, chapters, paragraphs, seed)]
+        size = sum(os.path.getsize(p) for p in files)
+
+        with redirect_stdout(StringIO()):
+            stages = time_stages(files, web_root(tmp), repeat)
+
+    return {
+        "corpus": {"articles": articles, "chapters": chapters,
+                   "paragraphs": paragraphs, "seed": seed, "bytes": size},
+        "python": platform.python_version(),
+        "stages": stages,
+    }
+
+
+def time_stages(files, root, repeat):
+    tokenizer, parser = TokenizeComponent(), ParseComponent()
+    stages = {}
+
+    def lex():
+        chunks = []
+        for path in files:
+            with open(path) as f:
+                chunks += _component_iterator(f)
+
+        return chunks
+
+    stages["lex"], chunks = best(lex, repeat)
+
+    def tokenize():
+        return [(c[0].strip(), tokenizer.input_map[c[0].strip()](c)[0])
+                for c in chunks]
+
+    stages["tokenize"], tokens = best(tokenize, repeat)
+
+    def validate():
+        return [parser.input_map[comp_id](t) for comp_id, t in tokens]
+
+    stages["validate"], _ = best(validate, repeat)
+
+    documents, parser_err = parse_documents(files, FEATURES, False)
+    assert not parser_err, "the synthetic corpus should be valid"
+
+    engine = SeoEngine()
+    args = Namespace(verbose=False)
+
+    stages["seo"], _ = best(lambda: set_recommended_keywords(
+        documents, args, engine=engine), repeat)
+
+    def related():
+        for document in documents:
+            document.related_topics = []
+
+        set_related_topics(documents, False)
+
+    stages["related"], _ = best(related, repeat)
+
+    context = RenderContext(root)
+    context.script_path = "/js/dist/journal.js"
+
+    def render_pages():
+        for document in documents:
+            "".join(htmldocument(document, False, context).result)
+
+    stages["render"], _ = best(render_pages, repeat)
+
+    def remove_pages():
+        for document in documents:
+            if os.path.exists(document.file_path):
+                os.remove(document.file_path)
+
+    def write():
+        assert len(render(documents, False, context)) == len(documents)
+
+    def write_unchanged():
+        assert render(documents, False, context) == []
+
+    stages["write"], _ = best(write, repeat, setup=remove_pages)
+    stages["write unchanged"], _ = best(write_unchanged, repeat)
+
+    return stages
+
+
+def compare(baseline, current, threshold=0.1):
+    if baseline["corpus"] != current["corpus"]:
+        print("[WARNING]: Baseline was taken on a different corpus: "
+              + json.dumps(baseline["corpus"]))
+
+    regressions = []
+    print(f"{'':<17}{'baseline':>13}{'current':>13}")
+
+    for stage in STAGES:
+        before = baseline["stages"].get(stage)
+        after = current["stages"].get(stage)
+
+        if before is None or after is None:
+            continue
+
+        change = after / before - 1
+        regressed = change > threshold and after > MIN_SECONDS
+        if regressed:
+            regressions.append(stage)
+
+        print(f"{stage + ':':<17}{before * 1000:10.1f} ms"
+              f"{after * 1000:10.1f} ms  {change:+7.1%}"
+              + ("  REGRESSION" if regressed else ""))
+
+    return regressions
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+def best(fn, repeat, setup=None):
+    timings = []
+
+    for _ in range(repeat):
+        if setup:
+            setup()
+
+        start = perf_counter()
+        value = fn()
+        timings.append(perf_counter() - start)
+
+    return min(timings), value
+
+
+def cli_arguments():
+    ap = ArgumentParser(prog="python -m bench.suite")
+    commands = ap.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Time every stage")
+    run.add_argument("--articles", type=int, default=20)
+    run.add_argument("--chapters", type=int, default=10)
+    run.add_argument("--paragraphs", type=int, default=5)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("-o", "--output", metavar="FILE",
+                     help="Write the timings as JSON, e.g. a new baseline")
+
+    compare = commands.add_parser("compare",
+                                  help="Flag stages slower than a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="Allowed slowdown, 0.1 is 10%%")
+
+    return ap.parse_args()
+
+
+def print_results(results):
+    c = results["corpus"]
+    print(f"corpus:           {c['articles']} articles, "
+          f"{c['chapters']} chapters, {c['bytes'] / 2 ** 20:.1f} MiB")
+
+    for stage, seconds in results["stages"].items():
+        print(f"{stage + ':':<17}{seconds * 1000:10.1f} ms")
+
+
+def web_root(directory):
+    root = os.path.join(directory, "web")
+
+    for path in INLINE_CSS + INLINE_CSS_AFTER_CRITICAL:
+        os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+        with open(os.path.join(root, path), "w") as f:
+            f.write("")
+
+    return root
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import os
+import pickle
+from hashlib import sha1
+from typing import Any, Iterable, Optional, Sequence
+
+
+# one pickle per key, entries of another fingerprint are dropped on open
+class DiskCache:
+    def __init__(self, directory: str, fingerprint: str = "",
+                 max_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._check_fingerprint(fingerprint)
+        self._size = sum(os.path.getsize(e) for e in self._entries())
+
+    def get(self, key: str, default=None):
+        value = self._load(key)
+
+        if value is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        path = self._path(key)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        try:
+            self._size -= os.path.getsize(path)
+        except OSError:
+            pass
+
+        atomic_write(path, data)
+        self._size += len(data)
+
+        if self.max_bytes is not None and self._size > self.max_bytes:
+            self._evict()
+
+    def clear(self):
+        for entry in self._entries():
+            os.remove(entry)
+
+        self._size = 0
+
+    def _check_fingerprint(self, fingerprint):
+        path = os.path.join(self.directory, "FINGERPRINT")
+
+        try:
+            with open(path) as f:
+                if f.read() == fingerprint:
+                    return
+
+        except OSError:
+            pass
+
+        self.clear()
+        atomic_write(path, fingerprint.encode())
+
+    def _entries(self):
+        with os.scandir(self.directory) as it:
+            return [e.path for e in it if e.name.endswith(".pickle")]
+
+    def _evict(self):
+        # entry mtimes are bumped on every load, oldest is least recently used
+        entries = []
+        for path in self._entries():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+
+            entries.append((st.st_mtime_ns, st.st_size, path))
+
+        entries.sort()
+
+        for _, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            self._size -= size
+            self.evictions += 1
+
+    def _load(self, key):
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+
+            if self.max_bytes is not None:
+                os.utime(path)
+
+        except (OSError, EOFError, pickle.UnpicklingError,
+                AttributeError, ImportError):
+            return None
+
+        return value
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+
+# validated components by chunk hash, a missing web root path is a miss
+class ComponentCache(DiskCache):
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        super().__init__(directory, parser_fingerprint(), max_bytes)
+
+    def get(self, chunk: Iterable[str], default=None):
+        import model
+
+        value = self._load(content_hash(chunk))
+
+        if value is None or model.missing_paths(value):
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def set(self, chunk: Iterable[str], value: Any):
+        super().set(content_hash(chunk), value)
+
+
+# validated articles by journal path, stamp and content hash
+class ArticleCache(DiskCache):
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        super().__init__(directory, parser_fingerprint(), max_bytes)
+
+    def get(self, path: str):
+        import model
+
+        key = path_key(path)
+        entry = self._load(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stamp = file_stamp(path)
+        if stamp != entry["stamp"]:
+            if file_hash(path) != entry["hash"]:
+                self.misses += 1
+                return None
+
+            entry["stamp"] = stamp
+            super().set(key, entry)
+
+        article = model.load_article(entry["article"])
+
+        if any(model.missing_paths(m) for m in
+               [article.meta, article.introduction, *article.items]):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return article
+
+    def set(self, path: str, article, stamp, digest: str):
+        # file_stamp taken before the journal was read and the sha1 of the
+        # bytes parsed, an edit saved meanwhile is then a miss on get
+        import model
+
+        super().set(path_key(path), {
+            "stamp": stamp,
+            "hash": digest,
+            "article": model.dump_article(article)
+        })
+
+
+# keyword histograms by content text, seo.py and nltk data as fingerprint
+class KeywordCache(DiskCache):
+    def __init__(self, directory: str):
+        import seo
+
+        super().__init__(directory, source_fingerprint(
+            [seo], seo.data_fingerprint()))
+
+    def get(self, text: str, default=None):
+        return super().get(content_hash([text]), default)
+
+    def set(self, text: str, histogram):
+        super().set(content_hash([text]), histogram)
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+def atomic_write(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp, "wb") as f:
+        f.write(data)
+
+    os.replace(tmp, path)
+
+
+def replace_if_changed(path: str, chunks: Sequence[str]) -> bool:
+    # an unchanged page is not written, chunks are never joined in memory
+    h = sha1()
+    update = h.update
+
+    for chunk in chunks:
+        update(chunk.encode())
+
+    if file_hash(path) == h.hexdigest():
+        return False
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp, "wb") as f:
+        write = f.write
+        for chunk in chunks:
+            write(chunk.encode())
+
+    os.replace(tmp, path)
+    return True
+
+
+def content_hash(chunk: Iterable[str]) -> str:
+    h = sha1()
+    update = h.update
+
+    for line in chunk:
+        update(line.encode())
+
+    return h.hexdigest()
+
+
+def file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return sha1(f.read()).hexdigest()
+
+    except OSError:
+        return None
+
+
+def file_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    return (st.st_mtime_ns, st.st_size)
+
+
+def parser_fingerprint() -> str:
+    import journalparser
+    import model
+    import pydantic
+
+    return source_fingerprint([model, journalparser], pydantic.VERSION)
+
+
+def path_key(path: str) -> str:
+    return sha1(os.path.abspath(path).encode()).hexdigest()
+
+
+def source_fingerprint(modules, *extra: str) -> str:
+    h = sha1()
+
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            h.update(f.read())
+
+    for e in extra:
+        h.update(e.encode())
+
+    return h.hexdigest()
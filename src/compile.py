@@ -1,101 +1,342 @@
+import json
 import os
 from argparse import ArgumentParser
-from cProfile import runctx
+from collections import Counter, defaultdict
+from functools import partial
 from glob import glob
-from sys import exit
-from typing import List
+from hashlib import sha1
+from io import StringIO
+from sys import exit, stdin
+from time import perf_counter, sleep
+from typing import Dict, Iterable, List, Set, Tuple
+
+import memprofile
+import tracing
+from buildcache import ArticleCache, ComponentCache, KeywordCache, \
+    file_stamp, replace_if_changed
+from journalparser import check, parse
+from memprofile import checkpoint
+from model import Article, InteractiveExamplePath, stat_cache, \
+    web_root_paths
+from render.html.context import RenderContext, interactive_example_index
+from tracing import span, traced_map
+
+# render.html.skeleton.BACKENDS, not imported until pages are rendered
+BACKEND_NAMES = ("fast", "yattag")
+
+CACHE_DIR = ".cache"
+
+FEATURES = {"feedback": True, "journal-like": True,
+            "interactive-example": True, "related-topics": True,
+            "missing-chapters-hint": True, "chapter-index": True,
+            "subscriptions": False
+            }
+
+JOURNALS = "../journal/**/*.journal"
+
+# relative to the web root, everything RenderContext reads
+WATCHED_ASSETS = ("stylesheets/inline/**/*.css", "fonts/styles.css",
+                  "js/prod_template.js", "js/modules/*.js",
+                  "interactive-examples/*/index.html")
 
-from yattag import indent
 
-from journalparser import parse
-from model import Article
-from render.html.skeleton import htmldocument
-from seo import extract_nouns, most_common_words_histogram
+def main(args):
+    if args.check == ["-"]:
+        check_stdin()
+        return
 
+    if args.check is not None:
+        # lexing, tokenizing and validation only, nltk and yattag never load
+        exit(0 if check_files(args.check or files(args)) else 1)
 
-def main(args):
-    features = {"feedback": True, "journal-like": True,
-                "interactive-example": True, "related-topics": True,
-                "missing-chapters-hint": True, "chapter-index": True,
-                "subscriptions": False
-                }
+    if args.watch:
+        Watcher(args).run()
+        return
+
+    tracer = tracing.enable() if args.trace else None
+    profile = None
+    if args.memory_profile:
+        profile = memprofile.enable(args.memory_profile)
+
+    documents, context = [], None
+    try:
+        with span("build"):
+            documents, context = build(args)
+
+    # build exits on parser errors, keep what was recorded until then
+    finally:
+        if tracer:
+            tracer.save(args.trace)
+
+        if profile:
+            profile.stop()
+            profile.report(documents, context)
+
+
+def build(args):
+    features = FEATURES
+
+    component_cache = article_cache = None
+    if args.cache:
+        component_cache = ComponentCache(
+            os.path.join(CACHE_DIR, "components"),
+            max_bytes=args.cache_size * 2 ** 20)
+        article_cache = ArticleCache(
+            os.path.join(CACHE_DIR, "articles"),
+            max_bytes=args.cache_size * 2 ** 20)
+
+    with span("discover files"):
+        journals = files(args)
+    checkpoint("discover files")
 
     documents, parser_err = parse_documents(
-        files(args), features, args.verbose)
+        journals, features, args.verbose, args.jobs,
+        component_cache=component_cache, article_cache=article_cache)
+
+    checkpoint("parse_documents")
+
+    if component_cache:
+        print_cache_stats("Component cache", component_cache, args.verbose)
+    if article_cache:
+        print_cache_stats("Article cache", article_cache, args.verbose)
 
     if parser_err:
         exit(1)
 
-    set_recommended_keywords(documents, args)
+    keyword_cache = None
+    if args.cache:
+        keyword_cache = KeywordCache(os.path.join(CACHE_DIR, "keywords"))
+
+    set_recommended_keywords(documents, args, keyword_cache)
 
     print_keywords_intel(args.verbose)
+    checkpoint("set_recommended_keywords")
+
+    with span("set_related_topics"):
+        set_related_topics(documents, args.verbose)
+    checkpoint("set_related_topics")
 
-    set_related_topics(documents, args.verbose)
+    context = RenderContext(backend=args.backend)
+    changed = render(documents, args.verbose, context, args.jobs,
+                     args.indent)
+    checkpoint("render")
 
-    render(documents, args.verbose)
+    print_changed_pages(changed, len(documents))
 
     print(CliFormat.dim("Done."))
 
+    return documents, context
+
+
+def check_files(paths) -> bool:
+    valid = True
+
+    for path in paths:
+        errors = check_file(path)
+        valid = valid and not errors
+
+        for error in errors:
+            print(json.dumps(error))
+
+    return valid
+
+
+def check_stdin():
+    # every answer ends with {"file": path, "errors": count}
+    for line in stdin:
+        path = line.rstrip("\r\n")
+        if not path:
+            continue
+
+        # pictures or examples may have been added since the last file
+        stat_cache.clear()
+        errors = check_file(path)
+
+        for error in errors:
+            print(json.dumps(error))
+        print(json.dumps({"file": path, "errors": len(errors)}), flush=True)
+
 
 def files(args):
     if args.file:
         return [args.file]
     else:
-        return glob("../journal/**/*.journal", recursive=True)
+        return glob(JOURNALS, recursive=True)
 
 
-def parse_documents(files, features, verbose):
+def parse_documents(files, features, verbose, jobs=1,
+                    component_cache=None, article_cache=None):
     docs = []
     append_doc = docs.append
     parser_err = False
+    parse_one = partial(parse_file, verbose=verbose)
 
-    for path in files:
-        content = None
-        with open(path) as f:
-            for content, err in parse(f):
-                if err:
-                    print(r"    - " + err)
+    cached = [article_cache.get(path) if article_cache else None
+              for path in files]
+    changed = [path for path, content in zip(files, cached) if not content]
 
-                    if not verbose:
-                        break
+    with executor(jobs, component_cache=component_cache) as ex, \
+            span("parse_documents"):
+        results = traced_map(ex, parse_one, changed, "parse_file")
 
-        if not content:
-            print_parser_fail(path)
-            parser_err = True
-            continue
+        # results come back in file order, errors are printed in file order
+        for path, content in zip(files, cached):
+            errors = []
+
+            if not content:
+                content, errors, stamp, digest, counts = next(results)
+
+                # workers count in their own copy of the cache
+                if component_cache and jobs > 1:
+                    component_cache.hits += counts[0]
+                    component_cache.misses += counts[1]
+
+                if content and article_cache:
+                    article_cache.set(path, content, stamp, digest)
 
-        append_doc(Document(path, features, content))
+            for err in errors:
+                print(r"    - " + err)
+
+            if not content:
+                print_parser_fail(path)
+                parser_err = True
+                continue
+
+            append_doc(Document(path, features, content))
 
     return docs, parser_err
 
 
-def render(documents, verbose):
-    for document in documents:
-        htmlfile = document.file_path
-        with open(htmlfile, "w") as f:
-            html = htmldocument(document, verbose)
-            f.write(indent(html.getvalue()))
+def parse_file(path, verbose):
+    cache = _worker.get("component_cache")
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    content = None
+    errors = []
+
+    # stamp first, an edit saved while parsing must not match the result
+    stamp = file_stamp(path)
+    with open(path, "rb") as f:
+        data = f.read()
+
+    for content, err in parse(StringIO(data.decode(), newline=None),
+                              cache=cache):
+        if err:
+            errors.append(err)
+
+            if not verbose:
+                break
+
+    if cache:
+        hits, misses = cache.hits - hits, cache.misses - misses
+
+    return content, errors, stamp, sha1(data).hexdigest(), (hits, misses)
+
+
+def render(documents, verbose, context=None, jobs=1, pretty=False):
+    # yattag and the render modules load with the first render
+    from render.html.skeleton import journalscript
+
+    context = context or RenderContext()
+    if context.script_path is None:
+        with span("assetpipeline"):
+            context.script_path = journalscript(context)
+
+    if jobs > 1:
+        context.preload(documents)
+
+    render_one = partial(render_file, verbose=verbose, pretty=pretty)
+
+    with executor(jobs, context=context) as ex, span("render"):
+        return [path for path in traced_map(ex, render_one, documents,
+                                            "render_file") if path]
+
+
+def render_file(document, verbose, pretty=False):
+    from render.html.skeleton import htmldocument
 
+    htmlfile = document.file_path
+    html = htmldocument(document, verbose, _worker["context"])
 
-def set_recommended_keywords(documents, args):
-    for document in documents:
-        n = extract_nouns(document.content_text())
-        h = most_common_words_histogram(" ".join(n))
+    # yattag indent() parses the whole page again, production pages are
+    # written as emitted, straight from the Doc's list of strings
+    if pretty:
+        from yattag import indent
+        chunks = [indent(html.getvalue())]
+    else:
+        chunks = html.result
+
+    # never leave a half written page where the web server can serve it,
+    # unchanged pages keep their mtime for CDN sync and critical css
+    if replace_if_changed(htmlfile, chunks):
+        return htmlfile
+
+    return None
+
+
+def set_recommended_keywords(documents, args, cache=None, engine=None):
+    texts = [document.content_text() for document in documents]
+    histograms = [cache.get(t) if cache else None for t in texts]
+    changed = [t for t, h in zip(texts, histograms) if h is None]
+
+    # unchanged documents skip tokenizing and tagging, and when all are
+    # unchanged the nltk models are not even loaded
+    if changed:
+        if engine is None:
+            with span("load SeoEngine"):
+                # nltk alone takes a good part of the startup time
+                from seo import SeoEngine
+                engine = SeoEngine()
+        else:
+            engine.timings.update(dict.fromkeys(engine.timings, 0.0))
+
+        # SeoEngine.recommended_keywords, with a span per document
+        with span("extract_nouns_batch", documents=len(changed)):
+            nouns = iter(engine.extract_nouns_batch(changed))
+
+        for n, (document, text, h) in enumerate(
+                zip(documents, texts, histograms)):
+            if h is None:
+                with span("set_recommended_keywords", item=document.path):
+                    histograms[n] = h = engine.most_common_words_histogram(
+                        " ".join(next(nouns)))
+
+                if cache:
+                    cache.set(text, h)
+
+        print_seo_timings(engine.timings, verbose=args.verbose)
+
+    if cache:
+        print_keyword_cache_stats(cache, len(texts), verbose=args.verbose)
+
+    for document, h in zip(documents, histograms):
         document.recommended_keywords = h
 
         print_found_common_keywords(
             document.file_name, h, verbose=args.verbose)
         print_more_keyword_info(document, verbose=args.verbose)
 
+    return engine
+
 
 def set_related_topics(documents, verbose):
-    for document in documents_valid_as_related(documents):
+    valid = documents_valid_as_related(documents)
+    index = keyword_index(valid)
+    sizes = [len(set(d._content_keywords)) for d in valid]
+
+    for n, document in enumerate(valid):
         rts = document.related_topics
         append_topic = rts.append
         sort_topics = rts.sort
 
-        for other_doc in documents_valid_as_related(documents):
-            if other_doc is document:
+        # only documents sharing keywords can reach a match index <= 8,
+        # the index is |A| + |B| - shared, see keywords_match_index
+        keywords = set(document._content_keywords)
+        shared = Counter(i for k in keywords for i in index[k])
+        del shared[n]
+
+        for i in sorted(shared):
+            other_doc = valid[i]
+            if len(keywords) + sizes[i] - shared[i] > 8:
                 continue
 
             mi = document.keywords_match_index(other_doc)
@@ -132,6 +373,17 @@ class CliFormat:
         return "".join([f, s, "\033[0m"])
 
 
+class SerialExecutor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
 class Document():
     def __init__(self, path, features, content: Article):
         file_dir, file_name = os.path.split(path)
@@ -141,6 +393,7 @@ class Document():
             for feature in content.meta.opt_out.split(" "):
                 doc_features[feature] = False
 
+        self.path = path
         self.prod_dir = file_dir.split("..")[1]
         self.file_dir = file_dir
         self.file_name = file_name.split(".")[0]
@@ -187,29 +440,259 @@ class Document():
         return [k for k, v in self.recommended_keywords if v < 5]
 
 
+# rebuilds only what changed, the process and its caches stay warm
+class Watcher:
+    def __init__(self, args, journals: str = JOURNALS,
+                 root: str = os.pardir):
+        self.args = args
+        self.journals = [args.file] if args.file else [journals]
+        self.assets = [os.path.join(root, p) for p in WATCHED_ASSETS]
+        self.root = root
+        self.context = RenderContext(root, backend=args.backend)
+        self.documents: Dict[str, Document] = {}
+        self.engine = None
+        self.stamps = {}
+        # journal path to the web root files it references, kept while the
+        # journal fails to parse so restoring a file rebuilds it
+        self.references: Dict[str, Set[str]] = {}
+
+        self.component_cache = self.article_cache = self.keyword_cache = None
+        if args.cache:
+            self.component_cache = ComponentCache(
+                os.path.join(CACHE_DIR, "components"),
+                max_bytes=args.cache_size * 2 ** 20)
+            self.article_cache = ArticleCache(
+                os.path.join(CACHE_DIR, "articles"),
+                max_bytes=args.cache_size * 2 ** 20)
+            self.keyword_cache = KeywordCache(
+                os.path.join(CACHE_DIR, "keywords"))
+
+    def poll(self) -> List[str]:
+        stamps = snapshot(self.journals + self.assets)
+        stamps.update(file_stamps(set().union(*self.references.values())))
+
+        changed = sorted(p for p in stamps.keys() | self.stamps.keys()
+                         if stamps.get(p) != self.stamps.get(p))
+        self.stamps = stamps
+        return changed
+
+    def rebuild(self, changed: List[str]) -> List[str]:
+        args = self.args
+        referenced = set().union(*self.references.values())
+        dependents = {j for j, refs in self.references.items()
+                      if not refs.isdisjoint(changed)}
+        journals = sorted(dependents.union(
+            p for p in changed if p.endswith(".journal")))
+        assets = [os.path.relpath(p, self.root) for p in changed
+                  if not p.endswith(".journal") and p not in referenced]
+        removed = []
+
+        stat_cache.clear()
+
+        for path in journals:
+            document = self.documents.pop(path, None)
+
+            if path not in self.stamps:
+                self.references.pop(path, None)
+
+                if document and remove_page(document.file_path):
+                    removed.append(document.file_path)
+
+        parsed, _ = parse_documents(
+            [p for p in journals if p in self.stamps], FEATURES, args.verbose,
+            args.jobs, component_cache=self.component_cache,
+            article_cache=self.article_cache)
+
+        for document in parsed:
+            self.documents[document.path] = document
+            self.references[document.path] = referenced_files(
+                document, self.root)
+
+            # files referenced for the first time are not changes
+            for path, stamp in file_stamps(
+                    self.references[document.path]).items():
+                self.stamps.setdefault(path, stamp)
+
+        self.engine = set_recommended_keywords(
+            parsed, args, self.keyword_cache, self.engine) or self.engine
+
+        documents = [self.documents[p] for p in sorted(self.documents)]
+        before = [d.related_topics for d in documents]
+
+        for document in documents:
+            document.related_topics = []
+
+        set_related_topics(documents, args.verbose)
+
+        self.context.refresh()
+
+        stale = {id(d) for d in parsed}
+        stale.update(id(d) for d, rts in zip(documents, before)
+                     if d.related_topics != rts)
+        stale.update(id(d) for d in self.context.affected(documents, assets))
+
+        return removed + render([d for d in documents if id(d) in stale],
+                                args.verbose, self.context, args.jobs,
+                                args.indent)
+
+    def run(self):
+        print(CliFormat.dim("Watching for changes, press Ctrl+C to stop."))
+
+        try:
+            last_error = None
+
+            while True:
+                stamps = self.stamps
+                changed = self.poll()
+
+                if changed:
+                    start = perf_counter()
+
+                    try:
+                        pages = self.rebuild(changed)
+
+                    except Exception as e:
+                        # e.g. a journal replaced by an editor while parsing,
+                        # forget the changes to retry them with the next poll
+                        self.stamps = stamps
+                        if repr(e) != last_error:
+                            print_rebuild_error(e)
+                        last_error = repr(e)
+
+                    else:
+                        last_error = None
+                        print_changed_pages(pages, len(self.documents))
+                        print_rebuild_latency(
+                            len(changed), perf_counter() - start)
+
+                sleep(self.args.watch_interval)
+
+        except KeyboardInterrupt:
+            print(CliFormat.dim("Done."))
+
+
 ###########################################
 ################# HELPERS #################
 ###########################################
 
 
+# state of parse_file and render_file in this process, see executor
+_worker = {}
+
+
+def check_file(path: str) -> List[Dict]:
+    try:
+        with open(path) as f:
+            return [{"file": path, "line": line, "column": column,
+                     "message": message}
+                    for line, column, message in check(f)]
+
+    except (OSError, UnicodeDecodeError) as e:
+        return [{"file": path, "line": 1, "column": 1, "message": str(e)}]
+
+
 def cli_arguments():
     ap = ArgumentParser()
     ap.add_argument("-v", "--verbose", action="store_true", default=False,
                     help="Show all errors")
     ap.add_argument("-p", "--performance", action="store_true", default=False,
                     help="Show performance analysis")
+    ap.add_argument("--trace", metavar="FILE",
+                    help="Write stage timings as Chrome trace events")
+    ap.add_argument("--memory-profile", type=int, nargs="?", const=10,
+                    default=0, metavar="TOP",
+                    help="Show memory per stage, its TOP allocation sites "
+                         "and the size of every document, slows down "
+                         "--trace timings")
+    ap.add_argument("--check", nargs="*", metavar="FILE",
+                    help="Only validate FILE or all journals, print errors "
+                         "as JSON lines. With -, read the files from stdin "
+                         "and keep running")
     ap.add_argument("-f", "--file", help="Parse this file only")
-    return ap.parse_args()
+    ap.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                    help="Parse and render documents in N processes")
+    ap.add_argument("--backend", choices=BACKEND_NAMES, default="fast",
+                    help="Build pages with yattag or the faster compatible "
+                         "Doc")
+    ap.add_argument("--indent", action="store_true",
+                    help="Pretty print pages, slower, for debugging")
+    ap.add_argument("-w", "--watch", action="store_true",
+                    help="Rebuild changed documents until interrupted")
+    ap.add_argument("--watch-interval", type=float, default=0.5,
+                    metavar="SECONDS", help="Poll interval of --watch")
+    ap.add_argument("--no-cache", dest="cache", action="store_false",
+                    default=True, help="Parse and validate every document")
+    ap.add_argument("--cache-size", type=int, default=256, metavar="MB",
+                    help="Size cap of each parse cache")
+    args = ap.parse_args()
+
+    if args.check and "-" in args.check and len(args.check) > 1:
+        ap.error("--check -: files are read from stdin, pass no FILE")
+
+    return args
 
 
 def documents_valid_as_related(documents: List[Document]):
     return [d for d in documents if d.is_valid_as_related_topic()]
 
 
+def executor(jobs, **state):
+    # state shared by all tasks goes to each worker once, not with every task
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(jobs, initializer=init_worker,
+                                   initargs=(state,))
+
+    init_worker(state)
+    return SerialExecutor()
+
+
+def file_stamps(paths: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+    stamps = {}
+
+    for path in paths:
+        stamp = file_stamp(path)
+
+        if stamp is not None:
+            stamps[path] = stamp
+
+    return stamps
+
+
+def init_worker(state: Dict):
+    _worker.clear()
+    _worker.update(state)
+
+
+def keyword_index(documents: List[Document]) -> Dict[str, List[int]]:
+    index = defaultdict(list)
+
+    for n, document in enumerate(documents):
+        for keyword in set(document._content_keywords):
+            index[keyword].append(n)
+
+    return index
+
+
 def print_parser_fail(file_name):
     print("Parsing failed: " + file_name)
 
 
+def print_cache_stats(name, cache, verbose):
+    if not verbose:
+        return
+
+    print(CliFormat.dim(
+        f"{name}: {cache.hits} hits, {cache.misses} misses,"
+        f" {cache.evictions} evicted"))
+
+
+def print_changed_pages(changed, total):
+    print(CliFormat.dim(f"{len(changed)} of {total} pages changed"))
+    for path in changed:
+        print("    " + path)
+
+
 def print_found_common_keywords(entity, kws, verbose):
     if not verbose:
         return
@@ -235,6 +718,15 @@ def print_keywords_intel(verbose):
     print()
 
 
+def print_keyword_cache_stats(cache, total, verbose):
+    if not verbose:
+        return
+
+    print()
+    print(CliFormat.dim(
+        f"  > SEO cache: {cache.hits} of {total} documents served from cache"))
+
+
 def print_keywords_not_matching(s):
     print(
         CliFormat.red("  X"),
@@ -256,6 +748,15 @@ def print_more_keyword_info(doc: Document, verbose):
         print_keywords_not_matching(doc.content.meta.keywords)
 
 
+def print_rebuild_latency(changes, seconds):
+    print(CliFormat.dim(
+        f"Rebuilt {changes} changed files in {seconds * 1000:.0f}ms"))
+
+
+def print_rebuild_error(e: Exception):
+    print(CliFormat.bold(f"Rebuild failed, retrying: {e!r}"))
+
+
 def print_related_topics(doc: Document, verbose):
     if not verbose or len(doc.related_topics) == 0:
         return
@@ -267,15 +768,54 @@ def print_related_topics(doc: Document, verbose):
         print(CliFormat.dim("    " + str(topic)))
 
 
+def print_seo_timings(timings, verbose):
+    if not verbose:
+        return
+
+    print()
+    print(CliFormat.dim("  > SEO stages: " + ", ".join(
+        f"{stage} {seconds * 1000:.1f}ms"
+        for stage, seconds in timings.items())))
+
+
 def print_uncommon_keywords(k):
     print(
         CliFormat.red("  X"),
         f"Recommended keywords \"{k}\" are not common enough (use 5 times each).")
 
 
+def referenced_files(document: Document, root: str) -> Set[str]:
+    # an example directory keeps its mtime when index.html is edited
+    paths = set()
+
+    for m in [document.content.introduction, *document.content.items]:
+        for v, Field in web_root_paths(m):
+            paths.add(os.path.join(root, v.lstrip("/")))
+
+            if issubclass(Field, InteractiveExamplePath):
+                paths.add(os.path.join(root, interactive_example_index(v)))
+
+    return paths
+
+
+def remove_page(path: str) -> bool:
+    try:
+        os.remove(path)
+    except OSError:
+        return False
+
+    return True
+
+
+def snapshot(patterns: List[str]) -> Dict[str, Tuple[int, int]]:
+    return file_stamps(path for pattern in patterns
+                       for path in glob(pattern, recursive=True))
+
+
 if __name__ == "__main__":
     args = cli_arguments()
     if args.performance:
+        from cProfile import runctx
         runctx("main(args)", globals(), locals())
     else:
         main(args)
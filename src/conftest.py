@@ -0,0 +1,48 @@
+import os
+import pytest
+from model import stat_cache
+
+dir = os.path.dirname(os.path.abspath(__file__))
+
+
+###########################################
+############## FIXTURES  ##################
+###########################################
+
+
+@pytest.fixture
+def valid_journal_root(tmp_path, monkeypatch):
+    # the files fixtures/valid.journal references, paths are validated
+    # against ../ so tests run in root/src
+    root = tmp_path / "web"
+    for path in ["gallery/sample.jpg", "gallery/raspizero.jpg",
+                 "interactive-examples/poll/index.html"]:
+        write(root / path, "")
+
+    (root / "src").mkdir()
+    monkeypatch.chdir(str(root / "src"))
+    stat_cache.clear()
+
+    yield str(root)
+
+    stat_cache.clear()
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def read_fixture(file_name):
+    return read(os.path.join(dir, "fixtures", file_name))
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
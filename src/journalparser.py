@@ -1,12 +1,12 @@
 from functools import partial, reduce
+import re
 from re import match
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from operator import getitem
 
 from pydantic.error_wrappers import ValidationError
-from model import Article, Chapter, Introduction, Meta
-from model import type_chapter_with_gallery_url, type_chapter_with_picture_url
-from model import type_with_appendix_filepath
+from model import Article, Meta
+from model import chapter_model, introduction_model
 
 
 class TokenizePropertyValues():
@@ -139,7 +139,8 @@ class TokenizeComponent:
                 previously_blank = True
 
             elif match(r"^\|code", line):
-                append({"type": "code", "content": ""})
+                append({"type": "code", "kind": "code", "content": "",
+                        "text": None})
                 inside_code_block = True
 
             elif match(r"^code\|", line):
@@ -182,16 +183,14 @@ class ParseComponent:
 
     def parse_component_chapter(self, tokens: Dict):
         try:
-            Model = Chapter
-
-            if "appendix" in tokens and not is_url(tokens["appendix"]["href"]):
-                Model = type_with_appendix_filepath(Model)
-
-            if "gallery" in tokens and is_url(tokens["gallery"]["items"][0]):
-                Model = type_chapter_with_gallery_url(Model)
-
-            if "picture" in tokens and is_url(tokens["picture"]["src"]):
-                Model = type_chapter_with_picture_url(Model)
+            Model = chapter_model(
+                appendix_filepath=_appendix_is_filepath(tokens),
+                gallery_url=(
+                    "gallery" in tokens
+                    and is_url(tokens["gallery"]["items"][0])),
+                picture_url=(
+                    "picture" in tokens
+                    and is_url(tokens["picture"]["src"])))
 
             chapter = Model(**tokens)
 
@@ -203,10 +202,8 @@ class ParseComponent:
 
     def parse_component_introduction(self, tokens: Dict):
         try:
-            Model = Introduction
-
-            if "appendix" in tokens and not is_url(tokens["appendix"]["href"]):
-                Model = type_with_appendix_filepath(Model)
+            Model = introduction_model(
+                appendix_filepath=_appendix_is_filepath(tokens))
 
             intro = Model(**tokens)
 
@@ -242,6 +239,10 @@ def _analyze_incorrect_property(line: str, props: List):
         return err_msg_notation
 
 
+def _appendix_is_filepath(tokens: Dict):
+    return "appendix" in tokens and not is_url(tokens["appendix"]["href"])
+
+
 def _chunk_until_next_component(file) -> List[str]:
 
     fi = SeekableFileIterator(file)
@@ -264,6 +265,10 @@ def _chunk_until_next_component(file) -> List[str]:
 
 
 def _component_iterator(file):
+    return _lex_components(file)
+
+
+def _component_iterator_seekable(file):
     return iter(partial(_chunk_until_next_component, file), [])
 
 
@@ -283,6 +288,74 @@ def _invalid_tail(has_content_body, props, tail):
     return None
 
 
+def _lex_components(file) -> Iterator[List[str]]:
+    # same chunks as _chunk_until_next_component, but one read, no seeking
+    chunk = []
+    append = chunk.append
+
+    for line in lines(file.read()):
+        if drafting(line):
+            break
+
+        if chunk and component_identifier(line):
+            yield chunk
+            chunk = [line]
+            append = chunk.append
+        else:
+            append(line)
+
+    if chunk:
+        yield chunk
+
+
+ERR_PROPERTY_SYNTAX = re.compile(r'"([a-z_-]+)", like this')
+ERR_TARGET = re.compile(r': "(.*)"\Z', re.DOTALL)
+
+
+def _locate(comp: List[str], err: str) -> Tuple[int, int]:
+    # the messages name a property, quote the offending line, or neither
+    m = ERR_PROPERTY_SYNTAX.search(err)
+    target = m[1] if m else None
+
+    if not target:
+        m = ERR_TARGET.search(err)
+        target = m[1].rstrip() if m else ""
+
+        for n, line in enumerate(comp):
+            if target and line.rstrip() == target:
+                return n, 1
+
+    # like in default_err_msg, "->" separates nested keys
+    prop = target.split(": ")[0].split("->")[0]
+
+    for n, line in enumerate(comp[1:], 1):
+        if blank(line):
+            break
+
+        if line.startswith(prop + ": "):
+            return n, len(prop) + 3
+
+    return 0, 1
+
+
+def _tokenize_and_parse(comp_id: str, comp: List,
+                        parse: ParseComponent, tokenize: TokenizeComponent):
+    try:
+        tokens, err = tokenize.input_map[comp_id](comp)
+
+    except KeyError:
+        err = f"Error: Tokenizer for \"{comp_id}\" not implemented"
+
+    if err:
+        return None, err
+
+    try:
+        return parse.input_map[comp_id](tokens)
+
+    except KeyError:
+        return None, f"Error: Parser for \"{comp_id}\" not implemented"
+
+
 def _tokenize_component_properties(chunk: List):
     properties = {}
     tail = []
@@ -316,9 +389,15 @@ def _tokenize_property(line: str):
         return (None, None)
 
 
+ERR_FIRST_NOT_META = "Error: First component expected to be /meta component"
+ERR_SECOND_NOT_INTRO = ("Error: Second component expected to be "
+                        "/introduction component")
+
+
 def parse(file,
           parse: ParseComponent = ParseComponent(),
-          tokenize: TokenizeComponent = TokenizeComponent()):
+          tokenize: TokenizeComponent = TokenizeComponent(),
+          cache=None):
 
     result = {"items": []}
     append_items = result["items"].append
@@ -331,32 +410,23 @@ def parse(file,
         comp_is_intro = comp_id == "/introduction"
 
         if i == 0 and not comp_is_meta:
-            yield None, ("Error: First component expected to be "
-                         "/meta component")
+            yield None, ERR_FIRST_NOT_META
 
         elif i == 1 and not comp_is_intro:
-            yield None, ("Error: Second component expected to be "
-                         "/introduction component")
+            yield None, ERR_SECOND_NOT_INTRO
 
-        try:
-            tokens, err = tokenize.input_map[comp_id](comp)
-
-        except KeyError:
-            err = f"Error: Tokenizer for \"{comp_id}\" not implemented"
+        # cache: buildcache.ComponentCache, validated components by chunk hash
+        pcomp = cache.get(comp) if cache is not None else None
 
-        if err:
-            yield None, err
-            continue
-
-        try:
-            pcomp, err = parse.input_map[comp_id](tokens)
+        if pcomp is None:
+            pcomp, err = _tokenize_and_parse(comp_id, comp, parse, tokenize)
 
-        except KeyError:
-            err = f"Error: Parser for \"{comp_id}\" not implemented"
+            if err:
+                yield None, err
+                continue
 
-        if err:
-            yield None, err
-            continue
+            if cache is not None:
+                cache.set(comp, pcomp)
 
         if comp_is_meta or comp_is_intro:
             result[comp_id[1:]] = pcomp
@@ -371,6 +441,39 @@ def parse(file,
         yield Article(**result), None
 
 
+def check(file,
+          parse: ParseComponent = ParseComponent(),
+          tokenize: TokenizeComponent = TokenizeComponent()):
+    # like parse, but yields every error as 1-based (line, column, message)
+    line = 1
+    comp_count = 0
+
+    for i, comp in enumerate(_component_iterator(file)):
+        comp_count += 1
+        comp_id = comp[0].strip()
+
+        if i == 0 and comp_id != "/meta":
+            yield line, 1, ERR_FIRST_NOT_META
+
+        elif i == 1 and comp_id != "/introduction":
+            yield line, 1, ERR_SECOND_NOT_INTRO
+
+        _, err = _tokenize_and_parse(comp_id, comp, parse, tokenize)
+
+        if err:
+            n, column = _locate(comp, err)
+            yield line + n, column, err
+
+        line += len(comp)
+
+    # a missing component is reported on the last line of the file
+    if comp_count == 0:
+        yield max(line - 1, 1), 1, ERR_FIRST_NOT_META
+
+    elif comp_count == 1:
+        yield max(line - 1, 1), 1, ERR_SECOND_NOT_INTRO
+
+
 ###########################################
 ################# HELPERS #################
 ###########################################
@@ -457,6 +560,17 @@ def is_url(s):
     return bool(match(r"^[a-z]+://", s))
 
 
+def lines(s: str) -> List[str]:
+    sl = s.split("\n")
+    last = sl.pop()
+    sl = [line + "\n" for line in sl]
+
+    if last:
+        sl.append(last)
+
+    return sl
+
+
 def prop_missing_space(line: str):
     matches = line.rstrip().split(":", maxsplit=1)
 
@@ -474,10 +588,36 @@ def replace(sl: List[str], c1, c2):
     return [str(s).replace(c1, c2) for s in sl]
 
 
+PARAGRAPH_MARKUP = re.compile(r"(?P<note>Note:)|- \[(?P<box>.*?)\]")
+
+
 def str_paragraphs(ps: List[Dict]):
     for p in ps:
         if p["type"] is "text":
             p["content"] = " ".join(p["content"])
+            p["kind"], p["text"] = classify_paragraph(p["content"])
+
+
+def classify_paragraph(content: str) -> Tuple[str, Optional[str]]:
+    # text, note, checkbox, checked or bracket, the last for "- [...]" items
+    m = PARAGRAPH_MARKUP.match(content)
+
+    if m is None:
+        return "text", None
+
+    if m.group("note"):
+        return "note", content.replace("Note:", "")
+
+    box = m.group("box")
+    text = content[m.end():]
+
+    if " " in box:
+        return "checkbox", text
+
+    if "x" in box:
+        return "checked", text
+
+    return "bracket", text
 
 
 def truncate(s, l):
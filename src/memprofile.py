@@ -0,0 +1,146 @@
+import gc
+import sys
+import tracemalloc
+from types import FunctionType, ModuleType
+from typing import Dict, List, Optional, Tuple
+
+
+# tracemalloc snapshots between build stages, main process only
+class MemoryProfile:
+    def __init__(self, top: int = 10, frames: int = 1):
+        self.top = top
+        self.stages: List[Tuple[str, int, int, list]] = []
+
+        tracemalloc.start(frames)
+        self._keep(self._snapshot())
+
+    def checkpoint(self, stage: str):
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = self._snapshot()
+        current = traced(snapshot)
+
+        growth = snapshot.compare_to(self._previous, "lineno")
+        growth = [s for s in growth if s.size_diff > 0][:self.top]
+
+        self.stages.append((stage, current, peak - self._overhead, growth))
+        self._keep(snapshot)
+
+    def report(self, documents=(), context=None):
+        for stage, current, peak, growth in self.stages:
+            print()
+            print(f"[{stage}] traced {mib(current)}, peak {mib(peak)}")
+
+            for stat in growth:
+                print(f"    {stat.size_diff / 1024:+10.1f} KiB"
+                      f"  {stat.count_diff:+8d} blocks  {site(stat)}")
+
+        if documents:
+            print()
+            print_document_sizes(document_sizes(documents, context))
+
+    def _keep(self, snapshot):
+        self._previous = snapshot
+
+        # the snapshot kept for the next stage is traced as well
+        self._overhead = tracemalloc.get_traced_memory()[0] - traced(snapshot)
+        tracemalloc.reset_peak()
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def stop(self):
+        tracemalloc.stop()
+
+
+def checkpoint(stage: str):
+    if _profile is not None:
+        _profile.checkpoint(stage)
+
+
+def enable(top: int = 10) -> MemoryProfile:
+    global _profile
+
+    _profile = MemoryProfile(top)
+    return _profile
+
+
+def document_sizes(documents, context=None) -> List[Dict]:
+    # SEO text and page buffer are built again, the build does not keep them
+    from render.html.skeleton import htmldocument
+
+    sizes = []
+
+    for document in documents:
+        paragraphs = [p for item in document.content.items
+                      for p in (item.paragraphs or [])]
+        row = {
+            "document": document.path,
+            "retained": retained_size(document),
+            "article": retained_size(document.content),
+            "paragraphs": retained_size(paragraphs),
+            "seo text": retained_size(document.content_text()),
+        }
+
+        if context is not None:
+            doc = htmldocument(document, False, context)
+            row["page buffer"] = retained_size(doc.result)
+
+        sizes.append(row)
+
+    return sorted(sizes, key=lambda r: r["retained"], reverse=True)
+
+
+def retained_size(obj, seen: Optional[set] = None) -> int:
+    seen = set() if seen is None else seen
+    stack = [obj]
+    size = 0
+
+    while stack:
+        o = stack.pop()
+
+        if id(o) in seen or isinstance(o, _SHARED):
+            continue
+
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        stack.extend(gc.get_referents(o))
+
+    return size
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+_profile = None
+
+_IGNORED = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+_SHARED = (type, ModuleType, FunctionType)
+
+
+def mib(size: int) -> str:
+    return f"{size / 2 ** 20:.2f} MiB"
+
+
+def print_document_sizes(sizes: List[Dict]):
+    if not sizes:
+        return
+
+    columns = [c for c in sizes[0] if c != "document"]
+    print("Retained per document (KiB):")
+    print("    " + "".join(f"{c:>13}" for c in columns) + "  document")
+
+    for row in sizes:
+        print("    " + "".join(f"{row[c] / 1024:13.1f}" for c in columns)
+              + "  " + row["document"])
+
+
+def site(stat) -> str:
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def traced(snapshot) -> int:
+    return sum(t.size for t in snapshot.traces)
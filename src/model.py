@@ -1,14 +1,25 @@
+import os
 from datetime import date
-from typing import Any, List, Optional
-from pydantic import BaseModel, constr, stricturl, validator
+from functools import cache
+from itertools import product
+from typing import Any, List, Optional, Tuple
+from pydantic import AnyUrl, BaseModel, constr, errors, validator
+from pydantic.fields import SHAPE_LIST
 from pydantic.main import Extra
-from pydantic.types import DirectoryPath, FilePath
+from pydantic.validators import path_validator
 from re import match
 
 
+class HttpsUrl(AnyUrl):
+    # stricturl(allowed_schemes=["https"]), but with a module level name so
+    # validated models can be pickled
+    tld_required = True
+    allowed_schemes = {"https"}
+
+
 class Meta(BaseModel):
     author: constr(min_length=2, max_length=48)
-    website: stricturl(allowed_schemes=["https"])
+    website: HttpsUrl
     year: constr(min_length=4)
     title: constr(min_length=24, max_length=60)
     description: constr(min_length=50, max_length=160)
@@ -47,16 +58,92 @@ class Meta(BaseModel):
         return v
 
 
+# file or directory lookups, one scandir per directory, clear() between builds
+class StatCache:
+    DIR = "dir"
+    FILE = "file"
+    OTHER = "other"
+
+    def __init__(self):
+        self._listings = {}
+        self._kinds = {}
+
+    def clear(self):
+        self._listings.clear()
+        self._kinds.clear()
+
+    def kind(self, path) -> Optional[str]:
+        path = str(path)
+
+        try:
+            return self._kinds[path]
+        except KeyError:
+            pass
+
+        normpath = os.path.normpath(path)
+        parent, name = os.path.split(normpath)
+
+        if name in ("", os.curdir, os.pardir):
+            kind = self.DIR if os.path.isdir(normpath) else None
+        else:
+            kind = self._listing(parent or os.curdir).get(name)
+
+        self._kinds[path] = kind
+        return kind
+
+    def warm(self, root: str, skip=("node_modules",)):
+        stack = [os.path.normpath(root)]
+
+        while stack:
+            directory = stack.pop()
+            listing = self._listing(directory)
+
+            for name, kind in listing.items():
+                if kind == self.DIR and name[0] != "." and name not in skip:
+                    stack.append(os.path.join(directory, name))
+
+    def _listing(self, directory):
+        listing = self._listings.get(directory)
+        if listing is not None:
+            return listing
+
+        listing = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    listing[entry.name] = self._entry_kind(entry)
+
+        except OSError:
+            pass
+
+        self._listings[directory] = listing
+        return listing
+
+    def _entry_kind(self, entry):
+        try:
+            if entry.is_dir():
+                return self.DIR
+
+            if entry.is_file():
+                return self.FILE
+
+        except OSError:
+            return None
+
+        return self.OTHER
+
+
+stat_cache = StatCache()
+
+
 class WebRootPath(str):
-    ext_validators = DirectoryPath
+    expected_kind = StatCache.DIR
 
     @classmethod
     def __get_validators__(cls):
         yield cls.one_folder_up
-
-        for validate in cls.ext_validators.__get_validators__():
-            yield validate
-
+        yield path_validator
+        yield cls.path_kind
         yield cls.set_absolute
 
     @classmethod
@@ -68,20 +155,67 @@ class WebRootPath(str):
 
         return v
 
+    @classmethod
+    def path_kind(cls, v):
+        # like pydantic's DirectoryPath / FilePath, but through stat_cache
+        kind = stat_cache.kind(v)
+
+        if kind is None:
+            raise errors.PathNotExistsError(path=v)
+
+        if kind != cls.expected_kind:
+            if cls.expected_kind == StatCache.DIR:
+                raise errors.PathNotADirectoryError(path=v)
+
+            raise errors.PathNotAFileError(path=v)
+
+        return v
+
     @classmethod
     def set_absolute(cls, v):
         v = str(v)
         v = v[2:]
         return v
 
+    @classmethod
+    def exists(cls, v) -> bool:
+        # v as validated, like /gallery/img.png
+        return stat_cache.kind(".." + v) == cls.expected_kind
+
 
 class WebRootFilePath(WebRootPath):
-    ext_validators = FilePath
+    expected_kind = StatCache.FILE
+
+
+class InteractiveExamplePath(WebRootPath):
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.one_folder_up
+        yield path_validator
+        yield cls.path_kind
+        yield cls.has_index
+        yield cls.set_absolute
+
+    @classmethod
+    def exists(cls, v) -> bool:
+        return super().exists(v) and \
+            stat_cache.kind(os.path.join(".." + v, "index.html")) == \
+            StatCache.FILE
+
+    @classmethod
+    def has_index(cls, v):
+        # checked while parsing, so rendering never misses the example
+        index = os.path.join(v, "index.html")
+
+        if stat_cache.kind(index) != StatCache.FILE:
+            raise errors.PathNotAFileError(path=index)
+
+        return v
 
 
 class Appendix(BaseModel):
     description: constr(min_length=3, max_length=48)
-    href: stricturl(allowed_schemes=["https"])
+    href: HttpsUrl
 
 
 class AppendixFilePath(Appendix):
@@ -104,7 +238,7 @@ class Gallery(BaseModel):
 
 
 class GalleryUrl(Gallery):
-    items: List[stricturl(allowed_schemes=["https"])]
+    items: List[HttpsUrl]
 
 
 class Picture(BaseModel):
@@ -113,28 +247,31 @@ class Picture(BaseModel):
 
 
 class PictureUrl(Picture):
-    src: stricturl(allowed_schemes=["https"])
+    src: HttpsUrl
 
 
 class Quote(BaseModel):
     author: constr(min_length=2, max_length=48)
     content: constr(min_length=10)
-    reference: stricturl(allowed_schemes=["https"])
+    reference: HttpsUrl
 
 
 class Paragraph(BaseModel):
     type: str
     content: str
+    # set by the tokenizer, see journalparser.classify_paragraph
+    kind: str = "text"
+    text: Optional[str] = None
 
 
 class Chapter(BaseModel):
     author: constr(min_length=2, max_length=48)
     topic: constr(min_length=8, max_length=60)
     date: date
-    website: Optional[stricturl(allowed_schemes=["https"])]
+    website: Optional[HttpsUrl]
     appendix: Optional[Appendix]
     picture: Optional[Picture]
-    interactive_example: Optional[WebRootPath]
+    interactive_example: Optional[InteractiveExamplePath]
     gallery: Optional[Gallery]
     quote: Optional[Quote]
     paragraphs: Optional[List[Paragraph]]
@@ -151,6 +288,21 @@ class Article(BaseModel):
     items: List[Any]
 
 
+def chapter_model(appendix_filepath: bool = False,
+                  gallery_url: bool = False,
+                  picture_url: bool = False):
+    return _chapter_model(
+        bool(appendix_filepath), bool(gallery_url), bool(picture_url))
+
+
+def dump_article(article: Article):
+    return (
+        _dump_model(article.meta),
+        _dump_model(article.introduction),
+        [_dump_model(item) for item in article.items]
+    )
+
+
 def duplicates(l: List):
     return len(l) is not len(set(l))
 
@@ -159,6 +311,122 @@ def in_between(n, mi, mx):
     return n >= mi and n <= mx
 
 
+def introduction_model(appendix_filepath: bool = False):
+    return _introduction_model(bool(appendix_filepath))
+
+
+def load_article(data) -> Article:
+    # construct() skips validation, only for data validated before dumping
+    meta, introduction, items = data
+    return Article.construct(
+        meta=_load_model(meta),
+        introduction=_load_model(introduction),
+        items=[_load_model(item) for item in items])
+
+
+def missing_paths(m: BaseModel) -> List[str]:
+    # files of a cached model may have been removed since it was validated
+    return [v for v, Field in web_root_paths(m) if not Field.exists(v)]
+
+
+@cache
+def _chapter_model(appendix_filepath, gallery_url, picture_url):
+    Model = Chapter
+
+    if appendix_filepath:
+        Model = type_with_appendix_filepath(Model)
+
+    if gallery_url:
+        Model = type_chapter_with_gallery_url(Model)
+
+    if picture_url:
+        Model = type_chapter_with_picture_url(Model)
+
+    return _module_level(Model, _chapter_variant_name(
+        appendix_filepath, gallery_url, picture_url))
+
+
+def _chapter_variant_name(appendix_filepath, gallery_url, picture_url):
+    sl = ["Chapter"]
+
+    if appendix_filepath:
+        sl.append("AppendixFilePath")
+
+    if gallery_url:
+        sl.append("GalleryUrl")
+
+    if picture_url:
+        sl.append("PicUrl")
+
+    return "".join(sl)
+
+
+@cache
+def _introduction_model(appendix_filepath):
+    if appendix_filepath:
+        return _module_level(
+            type_with_appendix_filepath(Introduction),
+            _introduction_variant_name(appendix_filepath))
+
+    return Introduction
+
+
+def _construct_model(Model, values: dict):
+    fields = Model.__fields__
+    values = values.copy()
+
+    for name, value in values.items():
+        field = fields[name]
+        Field = field.type_
+
+        if value is None or not _is_model(Field):
+            continue
+
+        if field.shape == SHAPE_LIST:
+            values[name] = [_construct_model(Field, v) for v in value]
+        else:
+            values[name] = _construct_model(Field, value)
+
+    return Model.construct(**values)
+
+
+def _dump_model(m: BaseModel):
+    return (type(m).__name__, m.dict(exclude_unset=True))
+
+
+def _introduction_variant_name(appendix_filepath):
+    return "IntroductionAppendixFilePath" if appendix_filepath \
+        else "Introduction"
+
+
+def _is_model(t):
+    return isinstance(t, type) and issubclass(t, BaseModel)
+
+
+def _load_model(dumped):
+    name, values = dumped
+    Model = globals().get(name) or __getattr__(name)
+    return _construct_model(Model, values)
+
+
+def _module_level(Model, name):
+    # variants are named like module attributes, so pickle can find them
+    # again through __getattr__ below (e.g. for the component cache)
+    Model.__name__ = Model.__qualname__ = name
+    return Model
+
+
+def __getattr__(name):
+    for variant in product((False, True), repeat=3):
+        if name == _chapter_variant_name(*variant):
+            return chapter_model(*variant)
+
+    if name == _introduction_variant_name(True):
+        return introduction_model(True)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def type_chapter_with_appendix_filepath(Model: Chapter):
     class ChapterAppendixFilePath(Model):
         appendix: AppendixFilePath
@@ -205,3 +473,23 @@ def words(ws: str):
 
 def words_in_between_length(min_l: int, max_l: int, ws: List[str]):
     return (in_between(len(w), min_l, max_l) for w in ws)
+
+
+def web_root_paths(m: BaseModel) -> List[Tuple[str, type]]:
+    paths = []
+
+    for name, field in m.__fields__.items():
+        value = getattr(m, name, None)
+        Field = field.type_
+
+        if value is None:
+            continue
+
+        if isinstance(value, BaseModel):
+            paths += web_root_paths(value)
+
+        elif isinstance(Field, type) and issubclass(Field, WebRootPath):
+            values = value if field.shape == SHAPE_LIST else [value]
+            paths += [(v, Field) for v in values]
+
+    return paths
@@ -1,7 +1,7 @@
 from calendar import month_abbr
-from os import getcwd
-from re import findall, search, split
-import numpy
+from render.html.fragments import FEEDBACK_BUTTON, FEEDBACK_FORM, LIKE, \
+    NEW_CHAPTER_HINT
+from render.html.gallery import rows
 
 
 def pagehero(doc, introduction, topic, author, website, enable_subscriptions=False):
@@ -26,7 +26,7 @@ def pagehero(doc, introduction, topic, author, website, enable_subscriptions=Fal
         intro(doc, introduction)
 
 
-def chapter(doc, html_id, chapter, features):
+def chapter(doc, html_id, chapter, features, examples):
     with doc.tag("section", klass="project chapter", id=html_id):
 
         picture = chapter.picture
@@ -52,10 +52,7 @@ def chapter(doc, html_id, chapter, features):
                          style="display: block; max-height: " + picture.height)
 
                 if gallery:
-                    segmented_pictures = numpy.array(
-                        gallery.items).reshape(-1, 3)
-
-                    for gallery_segment in segmented_pictures:
+                    for gallery_segment in rows(gallery.items):
                         with doc.tag("div", klass="gallery-container"):
                             for gallerypicture in gallery_segment:
                                 doc.stag("img", loading="lazy",
@@ -84,13 +81,7 @@ def chapter(doc, html_id, chapter, features):
             chapter_content(doc, paragraphs)
 
             if features["interactive-example"] and chapter.interactive_example:
-                path = [
-                    getcwd(),
-                    "/../",
-                    chapter.interactive_example,
-                    "/index.html"
-                ]
-                html = open("".join(path)).read()
+                html = examples[chapter.interactive_example]
 
                 with doc.tag("div", klass="interactive-example margin-top-40 margin-bottom-40"):
                     doc.asis(html)
@@ -113,34 +104,32 @@ def chapter(doc, html_id, chapter, features):
 
 def chapter_content(doc, paragraphs):
     for paragraph in paragraphs:
-        if paragraph.type == "text":
-            content = paragraph.content
+        kind = paragraph.kind
 
-            with doc.tag("p"):
-                if search(r"^Note:", content):
-                    content = content.replace("Note:", "")
-                    doc.line("span", "Note", klass="note")
-                    doc.line("i", content)
-                elif search(r"^- \[.*?\]", content):
-                    checkboxcontent = findall(r"^- \[(.+?)\]", content)[0]
-
-                    if search(r" ", checkboxcontent):
-                        doc.stag("input", "", type="checkbox",
-                                 disabled="true", klass="inline-checkbox")
-                    elif search(r"x", checkboxcontent):
-                        doc.stag("input", "", type="checkbox", checked="true",
-                                 disabled="true", klass="inline-checkbox")
-
-                    content = split(r"^- \[.*?\]", content)[1]
-                    doc.text(content)
-                else:
-                    doc.text(content)
-
-        if paragraph.type == "code":
+        if kind == "code":
             with doc.tag("div", klass="fancy-code"):
                 with doc.tag("pre", klass="code"):
                     doc.text(paragraph.content)
 
+        elif kind == "text":
+            doc.line("p", paragraph.content)
+
+        elif kind == "note":
+            with doc.tag("p"):
+                doc.line("span", "Note", klass="note")
+                doc.line("i", paragraph.text)
+
+        else:
+            with doc.tag("p"):
+                if kind == "checkbox":
+                    doc.stag("input", "", type="checkbox",
+                             disabled="true", klass="inline-checkbox")
+                elif kind == "checked":
+                    doc.stag("input", "", type="checkbox", checked="true",
+                             disabled="true", klass="inline-checkbox")
+
+                doc.text(paragraph.text)
+
 
 def appendix(doc, apx):
     with doc.tag("div", klass="small-emphasis-container text-shorten"):
@@ -154,31 +143,12 @@ def appendix(doc, apx):
 
 
 def feedback_button(doc, idparent, topic):
-    with doc.tag("div", id="feedback-container-" + idparent, klass="feedback-container", style="position: relative"):
-        with doc.tag("div", klass="right text-shorten"):
-            with doc.tag("span", id="feedback-toggle-" + idparent, klass="leave-feedback"):
-                with doc.tag("span"):
-                    doc.line("i", "Send Feedback  ", klass="font-thin")
-                with doc.tag("span", klass="icon-bubble-comment-streamline-talk colorful-font font-regular"):
-                    doc.text("")
+    FEEDBACK_BUTTON.emit(doc, idparent=idparent)
 
 
 def feedback_form(doc, idparent, topic):
-    with doc.tag("div", id="feedback-form-container-" + idparent, klass="fancy-feedback margin-top-20", style="display: none"):
-        with doc.tag("form", ("data-netlify", "true"), klass="feedback-form", name="feedback", method="POST"):
-            doc.stag("input", type="hidden", name="topic", value=topic)
-            doc.line("h5", "Feedback scope:", klass="no-margin")
-            doc.line("h5", topic[:36] + "...", klass="no-margin")
-            doc.line("hr", "", klass="margin-top-10 margin-bottom-10")
-            doc.line("textarea", "", klass="no-border", name="content",
-                     placeholder="Click here to write your feedback")
-            doc.line("button", "Submit", klass="call-to-action no-border font-regular margin-top-20",
-                     type="submit", style="display: block; width: 100%; cursor: pointer;")
-            with doc.tag("div", klass="center"):
-                with doc.tag("small", klass="max-char-hint"):
-                    with doc.tag("span", klass="max-1000-characters"):
-                        doc.text("0")
-                    doc.text(" of max. 1500 characters")
+    FEEDBACK_FORM.emit(doc, idparent=idparent, topic=topic,
+                       scope=topic[:36] + "...")
 
 
 def chapterindex(doc, chapters, ids):
@@ -201,15 +171,7 @@ def chapterindex(doc, chapters, ids):
 
 
 def like(doc, topic):
-    with doc.tag("div", klass="center auto read-width-optimized margin-bottom-20", id="feature-like-journal"):
-        with doc.tag("form", ("data-netlify", "true"), name="Like +1 " + topic, method="POST", klass="like-form", id="like-form"):
-            doc.stag("input", type="hidden",
-                     name="content", value="Received +1")
-            with doc.tag("p"):
-                doc.line(
-                    "i", "Please click the heart icon if you enjoyed this article ! ")
-                doc.line(
-                    "span", "", klass="icon-bubble-love-streamline-talk font-big submit heartbeat-animation")
+    LIKE.emit(doc, topic=topic)
 
 
 def intro(doc, introduction):
@@ -223,10 +185,7 @@ def intro(doc, introduction):
             doc.line("a", appendix.description,
                      href=appendix.href)
 
-    with doc.tag("a", href="#", id="new-chapter-hint", style="display: none"):
-        with doc.tag("blockquote", klass="highlight"):
-            doc.text(
-                "A new chapter was released since your last visit ! Click this box to jump right in !")
+    NEW_CHAPTER_HINT.emit(doc)
 
 
 def create_better_date(d):
@@ -0,0 +1,123 @@
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+INLINE_CSS = ("stylesheets/inline/font.css", "fonts/styles.css")
+INLINE_CSS_AFTER_CRITICAL = ("stylesheets/inline/responsive.css",)
+
+
+# assets shared by every page of a build, read once
+class RenderContext:
+    def __init__(self, root: Optional[str] = None, backend: str = "fast"):
+        self.root = root or os.path.join(os.getcwd(), os.pardir)
+        self.backend = backend
+        self._assets: Dict[str, Tuple[int, str]] = {}
+        self._inline_css = None
+        self.script_path: Optional[str] = None
+
+    def asset(self, path: str) -> str:
+        try:
+            return self._assets[path][1]
+        except KeyError:
+            pass
+
+        full_path = os.path.join(self.root, path)
+        with open(full_path) as f:
+            content = f.read()
+
+        self._assets[path] = (os.stat(full_path).st_mtime_ns, content)
+        return content
+
+    def affected(self, documents, changed):
+        # critical CSS and examples only affect the pages using them
+        changed = set(changed)
+        dependencies = [self.dependencies(d) for d in documents]
+
+        if changed - set().union(*dependencies):
+            return list(documents)
+
+        return [d for d, deps in zip(documents, dependencies)
+                if deps & changed]
+
+    def critical_css(self, filename: str, verbose: bool) -> str:
+        path = critical_css_path(filename)
+
+        try:
+            content = self._assets[path][1]
+        except KeyError:
+            try:
+                content = self.asset(path)
+            except OSError:
+                # kept as missing, refresh notices when it is created
+                self._assets[path] = (None, None)
+                content = None
+
+        if content is None:
+            if (verbose):
+                print(f"[WARNING]: Critical CSS File not found: {filename}.css")
+
+            return ""
+
+        return content
+
+    def dependencies(self, document) -> Set[str]:
+        deps = {interactive_example_index(c.interactive_example)
+                for c in document.content.items if c.interactive_example}
+        deps.add(critical_css_path(document.file_name))
+        return deps
+
+    def interactive_examples(self, article) -> Dict[str, str]:
+        return {c.interactive_example: self.asset(
+                interactive_example_index(c.interactive_example))
+                for c in article.items if c.interactive_example}
+
+    def inline_css(self, filename: str, verbose: bool) -> str:
+        prefix, suffix = self._shared_css()
+        return "".join((prefix, self.critical_css(filename, verbose), suffix))
+
+    def preload(self, documents):
+        # read before render workers are started, they get a copy each
+        self._shared_css()
+
+        for document in documents:
+            self.critical_css(document.file_name, False)
+            self.interactive_examples(document.content)
+
+    def refresh(self) -> List[str]:
+        # forget assets changed on disk, for rebuilds in the same process
+        changed = []
+
+        for path, (mtime, _) in self._assets.items():
+            try:
+                current = os.stat(os.path.join(self.root, path)).st_mtime_ns
+            except OSError:
+                current = None
+
+            if current != mtime:
+                changed.append(path)
+
+        for path in changed:
+            del self._assets[path]
+
+        if changed:
+            self._inline_css = None
+            self.script_path = None
+
+        return changed
+
+    def _shared_css(self) -> Tuple[str, str]:
+        if self._inline_css is None:
+            before = [self.asset(p) for p in INLINE_CSS]
+            after = [self.asset(p) for p in INLINE_CSS_AFTER_CRITICAL]
+            self._inline_css = ("\n" + "\n\n".join(before) + "\n\n",
+                                "\n\n" + "\n\n".join(after))
+
+        return self._inline_css
+
+
+def critical_css_path(filename: str) -> str:
+    return os.path.join("stylesheets", "inline", "critical", filename + ".css")
+
+
+def interactive_example_index(path: str) -> str:
+    # validated examples are web root paths like /interactive-examples/poll
+    return os.path.join(path.lstrip("/"), "index.html")
@@ -0,0 +1,136 @@
+from yattag.simpledoc import attr_escape, html_escape
+
+
+# same markup as yattag's Doc, start tags are formatted once and reused
+class FastDoc:
+    _start_tags = {}
+
+    def __init__(self):
+        self.result = []
+        self._append = self.result.append
+        self._open = []
+
+    def asis(self, *strgs):
+        for strg in strgs:
+            if strg is None:
+                raise TypeError("Expected a string, got None instead.")
+
+            self._append(strg)
+
+    def attr(self, *args, **kwargs):
+        tag = self._open[-1]
+        tag.attrs += tuple(_attributes(args, kwargs).items())
+
+    def getvalue(self):
+        return "".join(self.result)
+
+    def line(self, tag_name, text_content, *args, **kwargs):
+        self._append("".join((self._start_tag(tag_name, args, kwargs),
+                              html_escape(text_content),
+                              "</", tag_name, ">")))
+
+    def stag(self, tag_name, *args, **kwargs):
+        key = (tag_name, "/", args, tuple(kwargs.items()))
+
+        try:
+            self._append(self._start_tags[key])
+        except KeyError:
+            self._append(_cache(key, "<%s />" % _format(
+                tag_name, tuple(_attributes(args, kwargs).items()))))
+
+    def tag(self, tag_name, *args, **kwargs):
+        return _Tag(self, tag_name, args, kwargs)
+
+    def text(self, *strgs):
+        if len(strgs) == 1:
+            self._append(html_escape(strgs[0]))
+        else:
+            self._append("".join(html_escape(s) for s in strgs))
+
+    def _start_tag(self, tag_name, args, kwargs):
+        key = (tag_name, args, tuple(kwargs.items()))
+
+        try:
+            return self._start_tags[key]
+        except KeyError:
+            return _cache(key, "<%s>" % _format(
+                tag_name, tuple(_attributes(args, kwargs).items())))
+
+
+class _Tag:
+    __slots__ = ("doc", "name", "args", "kwargs", "attrs", "position")
+
+    def __init__(self, doc, name, args, kwargs):
+        self.doc = doc
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __enter__(self):
+        doc = self.doc
+        self.attrs = ()
+        self.position = len(doc.result)
+        doc._append(doc._start_tag(self.name, self.args, self.kwargs))
+        doc._open.append(self)
+
+    def __exit__(self, tpe, value, traceback):
+        if value is None:
+            doc = self.doc
+            if self.attrs:
+                # attr() was called, merge like yattag does
+                attrs = _attributes(self.args, self.kwargs)
+                attrs.update(self.attrs)
+                doc.result[self.position] = "<%s>" % _format(
+                    self.name, tuple(attrs.items()))
+
+            doc._append("</%s>" % self.name)
+            doc._open.pop()
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+# bounds the start tag cache when attribute values vary per page
+MAX_START_TAGS = 4096
+
+_NO_VALUE = object()
+
+
+def _attributes(args, kwargs):
+    attrs = {}
+
+    for arg in args:
+        if isinstance(arg, tuple):
+            attrs[arg[0]] = arg[1]
+        elif isinstance(arg, str):
+            attrs[arg] = _NO_VALUE
+        else:
+            raise ValueError(
+                "Couldn't make a XML or HTML attribute/value pair out of %s."
+                % repr(arg))
+
+    for key, value in kwargs.items():
+        attrs["class" if key == "klass" else key] = value
+
+    return attrs
+
+
+def _cache(key, start_tag):
+    start_tags = FastDoc._start_tags
+
+    if len(start_tags) >= MAX_START_TAGS:
+        start_tags.clear()
+
+    start_tags[key] = start_tag
+    return start_tag
+
+
+def _format(tag_name, attrs):
+    if not attrs:
+        return tag_name
+
+    return " ".join([tag_name] + [
+        key if value is _NO_VALUE else '%s="%s"' % (key, attr_escape(value))
+        for key, value in attrs])
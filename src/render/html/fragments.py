@@ -0,0 +1,173 @@
+from yattag import Doc
+from yattag.simpledoc import attr_escape, html_escape
+
+
+# yattag markup rendered once with markers in its slots, kept as segments
+class Fragment:
+    def __init__(self, build, *slots: str, raw=()):
+        self.build = build
+        self.slots = slots
+        self.raw = raw
+        self._segments = None
+
+    def emit(self, doc, **values):
+        doc.asis(self.render(**values))
+
+    def render(self, **values) -> str:
+        if self._segments is None:
+            self._compile()
+
+        sl = []
+        append = sl.append
+        escaped = {}
+
+        for segment, slot in self._segments:
+            append(segment)
+
+            if slot is not None:
+                if slot not in escaped:
+                    name, escape = slot
+                    escaped[slot] = escape(values[name])
+
+                append(escaped[slot])
+
+        return "".join(sl)
+
+    def _compile(self):
+        doc = Doc()
+        self.build(doc, **{name: _marker(name) for name in self.slots})
+        markup = doc.getvalue()
+
+        segments = []
+        start = 0
+
+        for pos, name in sorted(_markers(markup, self.slots)):
+            if name in self.raw:
+                escape = _asis
+            elif markup.rfind("<", 0, pos) > markup.rfind(">", 0, pos):
+                escape = attr_escape
+            else:
+                escape = html_escape
+
+            segments.append((markup[start:pos], (name, escape)))
+            start = pos + len(_marker(name))
+
+        segments.append((markup[start:], None))
+        self._segments = segments
+
+
+###########################################
+################ FRAGMENTS ################
+###########################################
+
+
+def head(doc, description, keywords, author, css, title):
+    tag, stag, line, asis = doc.tag, doc.stag, doc.line, doc.asis
+
+    with tag("head"):
+
+        stag("meta", charset="utf-8")
+        stag("meta", ("http-equiv", "X-UA-Compatible"), content="chrome=1")
+        stag("meta", name="viewport", content="width=device-width")
+        stag("meta", name="description", content=description)
+        stag("meta", name="keywords", content=keywords)
+        stag("meta", name="author", content=author)
+        stag("link", rel="icon", type="image/svg+xml",
+             href="/img/favicon-5.svg")
+
+        with tag("style"):
+            asis(css)
+
+        asis(
+            "<!--[if lt IE 9]><script src=\"//html5shiv.googlecode.com/svn/trunk/html5.js\"></script><![endif]-->")
+
+        line("title", title)
+
+
+def home_footer(doc, copyright):
+    with doc.tag("div", klass="center  margin-top-40"):
+        with doc.tag("a", href="/", title="robingruenke.com"):
+            with doc.tag("span", klass="icon-home-house-streamline colorful-font font-big"):
+                doc.text("")
+
+    with doc.tag("div", klass="center"):
+        doc.line("small", copyright)
+
+
+def feedback_button(doc, idparent):
+    with doc.tag("div", id="feedback-container-" + idparent, klass="feedback-container", style="position: relative"):
+        with doc.tag("div", klass="right text-shorten"):
+            with doc.tag("span", id="feedback-toggle-" + idparent, klass="leave-feedback"):
+                with doc.tag("span"):
+                    doc.line("i", "Send Feedback  ", klass="font-thin")
+                with doc.tag("span", klass="icon-bubble-comment-streamline-talk colorful-font font-regular"):
+                    doc.text("")
+
+
+def feedback_form(doc, idparent, topic, scope):
+    with doc.tag("div", id="feedback-form-container-" + idparent, klass="fancy-feedback margin-top-20", style="display: none"):
+        with doc.tag("form", ("data-netlify", "true"), klass="feedback-form", name="feedback", method="POST"):
+            doc.stag("input", type="hidden", name="topic", value=topic)
+            doc.line("h5", "Feedback scope:", klass="no-margin")
+            doc.line("h5", scope, klass="no-margin")
+            doc.line("hr", "", klass="margin-top-10 margin-bottom-10")
+            doc.line("textarea", "", klass="no-border", name="content",
+                     placeholder="Click here to write your feedback")
+            doc.line("button", "Submit", klass="call-to-action no-border font-regular margin-top-20",
+                     type="submit", style="display: block; width: 100%; cursor: pointer;")
+            with doc.tag("div", klass="center"):
+                with doc.tag("small", klass="max-char-hint"):
+                    with doc.tag("span", klass="max-1000-characters"):
+                        doc.text("0")
+                    doc.text(" of max. 1500 characters")
+
+
+def like(doc, topic):
+    with doc.tag("div", klass="center auto read-width-optimized margin-bottom-20", id="feature-like-journal"):
+        with doc.tag("form", ("data-netlify", "true"), name="Like +1 " + topic, method="POST", klass="like-form", id="like-form"):
+            doc.stag("input", type="hidden",
+                     name="content", value="Received +1")
+            with doc.tag("p"):
+                doc.line(
+                    "i", "Please click the heart icon if you enjoyed this article ! ")
+                doc.line(
+                    "span", "", klass="icon-bubble-love-streamline-talk font-big submit heartbeat-animation")
+
+
+def new_chapter_hint(doc):
+    with doc.tag("a", href="#", id="new-chapter-hint", style="display: none"):
+        with doc.tag("blockquote", klass="highlight"):
+            doc.text(
+                "A new chapter was released since your last visit ! Click this box to jump right in !")
+
+
+HEAD = Fragment(head, "description", "keywords", "author", "css", "title",
+                raw=("css",))
+HOME_FOOTER = Fragment(home_footer, "copyright")
+FEEDBACK_BUTTON = Fragment(feedback_button, "idparent")
+FEEDBACK_FORM = Fragment(feedback_form, "idparent", "topic", "scope")
+LIKE = Fragment(like, "topic")
+NEW_CHAPTER_HINT = Fragment(new_chapter_hint)
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+def _asis(s):
+    return s
+
+
+def _marker(name):
+    return f"\x00{name}\x00"
+
+
+def _markers(markup, slots):
+    for name in slots:
+        marker = _marker(name)
+        pos = markup.find(marker)
+
+        while pos != -1:
+            yield pos, name
+            pos = markup.find(marker, pos + len(marker))
@@ -0,0 +1,12 @@
+from typing import List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+ROW_SIZE = 3
+
+
+def rows(items: Sequence[T], size: int = ROW_SIZE) -> List[Sequence[T]]:
+    if size < 1:
+        raise ValueError(f"gallery row size must be positive, got {size}")
+
+    return [items[i:i + size] for i in range(0, len(items), size)]
@@ -2,67 +2,37 @@ from yattag import Doc, indent
 import os
 import datetime
 import re
+from hashlib import sha1
+from io import StringIO
+from buildcache import atomic_write, file_hash
 from render.html.components import pagehero, chapterindex, chapter, like
+from render.html.context import RenderContext
+from render.html.fastdoc import FastDoc
+from render.html.fragments import HEAD, HOME_FOOTER
 
+BACKENDS = {"fast": FastDoc, "yattag": Doc}
 
-def htmldocument(document, verbose):
+
+def htmldocument(document, verbose, context=None):
     filename = document.file_name
     features = document.features
     data = document.content
     related_topics = document.related_topics
-    
-    responsivecss = open(
-        os.getcwd() + "/../stylesheets/inline/responsive.css").read()
-    fontcss = open(os.getcwd() + "/../stylesheets/inline/font.css").read()
-    iconfontcss = open(os.getcwd() + "/../fonts/styles.css").read()
-    criticalpathcss = os.getcwd() + "/../stylesheets/inline/critical/" + \
-        filename + ".css"
-
-    try:
-        criticalpathcss = open(criticalpathcss).read()
-
-    except:
-        if (verbose):
-            print(f"[WARNING]: Critical CSS File not found: {filename}.css")
-
-    printcss = open(os.getcwd() + "/../stylesheets/print.css").read()
-
-    packedinlinecss = "\n" + fontcss + "\n\n" + iconfontcss + \
-        "\n\n" + criticalpathcss + "\n\n" + responsivecss
-
-    packedjspath = assetpipeline("journal.js",
-                                 "js/modules/polyfills.js",
-                                 "js/modules/startup.js",
-                                 "js/modules/subscriptions.js",
-                                 "js/modules/chapterindex.js",
-                                 "js/modules/articleupdatehint.js",
-                                 "js/modules/gallery.js",
-                                 "js/modules/feedback.js",
-                                 "js/modules/likesubmit.js")
-
-    doc = Doc()
-    tag, text, stag, line, asis = doc.tag, doc.text, doc.stag, doc.line, doc.asis
-
-    asis("<!DOCTYPE html>")
-    with tag("html", lang="en"):
-        with tag("head"):
+    context = context or RenderContext()
 
-            stag("meta", charset="utf-8")
-            stag("meta", ("http-equiv", "X-UA-Compatible"), content="chrome=1")
-            stag("meta", name="viewport", content="width=device-width")
-            stag("meta", name="description", content=data.meta.description)
-            stag("meta", name="keywords", content=data.meta.keywords)
-            stag("meta", name="author", content=data.meta.author)
-            stag("link", rel="icon", type="image/svg+xml",
-                 href="/img/favicon-5.svg")
+    packedinlinecss = context.inline_css(filename, verbose)
 
-            with tag("style"):
-                asis(packedinlinecss)
+    if context.script_path is None:
+        context.script_path = journalscript(context)
 
-            asis(
-                "<!--[if lt IE 9]><script src=\"//html5shiv.googlecode.com/svn/trunk/html5.js\"></script><![endif]-->")
+    doc = BACKENDS[context.backend]()
+    tag, text, stag, line, asis = doc.tag, doc.text, doc.stag, doc.line, doc.asis
 
-            line("title", data.meta.title)
+    asis("<!DOCTYPE html>")
+    with tag("html", lang="en"):
+        HEAD.emit(doc, description=data.meta.description,
+                  keywords=data.meta.keywords, author=data.meta.author,
+                  css=packedinlinecss, title=data.meta.title)
 
         with tag("body"):
 
@@ -85,24 +55,19 @@ def htmldocument(document, verbose):
                     enable_subscriptions=features["subscriptions"])
 
                 with doc.tag("section", klass="projects"):
-                    journalcontent(doc, data, features)
+                    journalcontent(doc, data, features,
+                                   context.interactive_examples(data))
 
-                with doc.tag("div", klass="center  margin-top-40"):
-                    with doc.tag("a", href="/", title="robingruenke.com"):
-                        with doc.tag("span", klass="icon-home-house-streamline colorful-font font-big"):
-                            doc.text("")
-
-                with doc.tag("div", klass="center"):
-                    doc.line("small", copyright(data))
+                HOME_FOOTER.emit(doc, copyright=copyright(data))
 
     stag("link", href="/stylesheets/styles.css", rel="stylesheet")
     stag("link", href="/stylesheets/print.css", rel="stylesheet", media="print")
-    line("script", "", src=packedjspath)
+    line("script", "", src=context.script_path)
 
     return doc
 
 
-def journalcontent(doc, data, features):
+def journalcontent(doc, data, features, examples):
     # render chapter index
     if features["chapter-index"] and len(data.items) > 2:
         ids = [getnormalizedtopic(chapter.topic)
@@ -113,7 +78,7 @@ def journalcontent(doc, data, features):
 
     for i in data.items:
         html_id = getnormalizedtopic(i.topic)
-        chapter(doc, html_id, i, features)
+        chapter(doc, html_id, i, features, examples)
 
     if features["missing-chapters-hint"] and len(data.items) < 3:
         with doc.tag("blockquote", klass="last no-border margin-top-40", id="more-info"):
@@ -140,32 +105,63 @@ def copyright(data):
     return "".join(sl)
 
 
-def assetpipeline(prod_filename, *assets):
-    prod_file_type = prod_filename.split(".")[1]
+def journalscript(context):
+    return assetpipeline("journal.js", *JOURNAL_JS, context=context)
+
 
-    assets_content = ""
+def assetpipeline(prod_filename, *assets, context=None):
+    prod_name, prod_file_type = prod_filename.split(".")
+    context = context or RenderContext()
+
+    sl = []
     for asset in assets:
-        assets_content = assets_content + \
-            open(os.path.join(os.getcwd(), "..", asset)).read() + "\n\n"
+        sl += [context.asset(asset), "\n\n"]
+    assets_content = "".join(sl)
 
     if prod_file_type == "js":
-        prod_filepath = os.path.join("js", "dist", prod_filename)
-        file = open(os.path.join(os.getcwd(), "..", prod_filepath), "w")
-        prod_template = open(os.path.join(
-            os.getcwd(), "..", "js", "prod_template.js"))
+        prod_template = StringIO(context.asset(
+            os.path.join("js", "prod_template.js")))
 
-        prod_content = "// auto generated, don't modify \n\n"
+        sl = ["// auto generated, don't modify \n\n"]
         for line in prod_template:
             if re.search(r"^//{modules}", line):
-                prod_content = prod_content + assets_content + "\n\n"
+                sl += [assets_content, "\n\n"]
             else:
-                prod_content = prod_content + line
+                sl.append(line)
+        prod_content = "".join(sl)
+
+        # content hashed for long term caching, unchanged bundles are kept,
+        # a truncated one left by an interrupted build is written again
+        data = prod_content.encode()
+        digest = sha1(data).hexdigest()
+        prod_filepath = os.path.join(
+            "js", "dist", f"{prod_name}.{digest[:12]}.{prod_file_type}")
+        prod_abspath = os.path.join(context.root, prod_filepath)
 
-        file.write(prod_content)
-        file.close()
+        if file_hash(prod_abspath) != digest:
+            atomic_write(prod_abspath, data)
+
+        # bundles of earlier content are replaced by this one
+        dist, current = os.path.split(prod_abspath)
+        stale = re.compile(
+            rf"{re.escape(prod_name)}\.[0-9a-f]{{12}}\.{prod_file_type}\Z")
+
+        for name in os.listdir(dist):
+            if name != current and stale.match(name):
+                os.remove(os.path.join(dist, name))
 
         return "/" + prod_filepath
 
     else:
         raise TypeError(
             "assetPipeline: Unsupported filetype: " + prod_file_type)
+
+
+JOURNAL_JS = ("js/modules/polyfills.js",
+              "js/modules/startup.js",
+              "js/modules/subscriptions.js",
+              "js/modules/chapterindex.js",
+              "js/modules/articleupdatehint.js",
+              "js/modules/gallery.js",
+              "js/modules/feedback.js",
+              "js/modules/likesubmit.js")
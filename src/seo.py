@@ -1,14 +1,121 @@
-from nltk import FreqDist, word_tokenize, pos_tag
+import os
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+import nltk
+from nltk import FreqDist
+from nltk.tag.perceptron import PerceptronTagger
+from nltk.tokenize import NLTKWordTokenizer
+
+try:
+    from nltk.tokenize import PunktTokenizer
+except ImportError:  # nltk < 3.8.2 ships punkt as pickle only
+    PunktTokenizer = None
+
+
+# nltk.pos_tag builds a tagger per call, the engine keeps one per process
+class SeoEngine:
+    NOUNS = ("NN", "NNP")
+
+    def __init__(self, language: str = "english"):
+        self.timings = {"load": 0.0, "tokenize": 0.0,
+                        "tag": 0.0, "histogram": 0.0}
+
+        with self._timed("load"):
+            self._sentences = punkt(language).tokenize
+            self._words = NLTKWordTokenizer().tokenize
+            self._tagger = PerceptronTagger()
+
+    def extract_nouns(self, s: str) -> List[str]:
+        return self.extract_nouns_batch([s])[0]
+
+    def extract_nouns_batch(self, texts: List[str]) -> List[List[str]]:
+        with self._timed("tokenize"):
+            tokens = [self.word_tokenize(s) for s in texts]
+
+        with self._timed("tag"):
+            tagged = self._tagger.tag_sents(tokens)
+
+        nouns = self.NOUNS
+        return [[word for word, pos in tags if word.isalpha() and pos in nouns]
+                for tags in tagged]
+
+    def most_common_words_histogram(self, s: str) -> List[Tuple[str, int]]:
+        with self._timed("histogram"):
+            return FreqDist(self.word_tokenize(s)).most_common(5)
+
+    def recommended_keywords(self, texts: List[str]):
+        return [self.most_common_words_histogram(" ".join(n))
+                for n in self.extract_nouns_batch(texts)]
+
+    def word_tokenize(self, s: str) -> List[str]:
+        words = self._words
+        return [token for sent in self._sentences(s) for token in words(sent)]
+
+    def _timed(self, stage):
+        return _Timer(self.timings, stage)
+
+
+def data_fingerprint() -> str:
+    sl = [nltk.__version__]
+
+    for resource in DATA_RESOURCES:
+        try:
+            path = nltk.data.find(resource).path
+            st = os.stat(path)
+        except (LookupError, OSError, AttributeError):
+            continue
+
+        sl.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+
+    return "\n".join(sl)
+
+
+def default_engine() -> SeoEngine:
+    global _default_engine
+
+    if _default_engine is None:
+        _default_engine = SeoEngine()
+
+    return _default_engine
 
 
 def extract_nouns(s):
-    ft = ["NN", "NNP"]
-    t = word_tokenize(s)
-    tags = pos_tag(t)
-    tags = [t for t in tags if t[0].isalpha()]
-    return [word for word, pos in tags if pos in ft]
+    return default_engine().extract_nouns(s)
 
 
 def most_common_words_histogram(s):
-    tokens = word_tokenize(s)
-    return FreqDist(tokens).most_common(5)
+    return default_engine().most_common_words_histogram(s)
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+_default_engine = None
+
+DATA_RESOURCES = ("tokenizers/punkt", "tokenizers/punkt_tab",
+                  "taggers/averaged_perceptron_tagger",
+                  "taggers/averaged_perceptron_tagger_eng")
+
+
+class _Timer:
+    def __init__(self, timings: Dict[str, float], stage: str):
+        self._timings = timings
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = perf_counter()
+
+    def __exit__(self, *exc):
+        self._timings[self._stage] += perf_counter() - self._start
+        return False
+
+
+def punkt(language: str):
+    if PunktTokenizer is not None:
+        return PunktTokenizer(language)
+
+    from nltk.data import load
+    return load(f"tokenizers/punkt/{language}.pickle")
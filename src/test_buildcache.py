@@ -0,0 +1,171 @@
+import buildcache
+import os
+import pytest
+import shutil
+from buildcache import ArticleCache, DiskCache, KeywordCache, \
+    file_hash, file_stamp, replace_if_changed
+from conftest import read
+from journalparser import parse
+from model import stat_cache
+
+dir = os.path.dirname(os.path.abspath(__file__))
+
+
+###########################################
+############## FIXTURES  ##################
+###########################################
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    path = str(tmp_path / "valid.journal")
+    shutil.copy(os.path.join(dir, "fixtures", "valid.journal"), path)
+    return path
+
+
+@pytest.fixture
+def article(journal_path):
+    with open(journal_path) as f:
+        article, err = next(parse(f))
+
+    assert err is None
+    return article
+
+
+@pytest.fixture
+def article_cache(tmp_path):
+    return ArticleCache(str(tmp_path / "articles"))
+
+
+###########################################
+################# TESTS ###################
+###########################################
+
+
+def test_disk_cache_invalidated_by_fingerprint(tmp_path):
+    DiskCache(str(tmp_path), "model-v1").set("key", "value")
+    assert DiskCache(str(tmp_path), "model-v1").get("key") == "value"
+    assert DiskCache(str(tmp_path), "model-v2").get("key") is None
+
+
+def test_disk_cache_counters(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=2500)
+    cache.set("a", b"a" * 1000)
+    cache.set("b", b"b" * 1000)
+    os.utime(cache._path("a"), ns=(0, 0))
+    os.utime(cache._path("b"), ns=(1, 1))
+    cache.get("a")
+    cache.set("c", b"c" * 1000)
+
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_article_cache_miss(article_cache, journal_path):
+    assert article_cache.get(journal_path) is None \
+        and article_cache.misses == 1
+
+
+def test_article_cache_hit(article_cache, journal_path, article):
+    msg = "should rebuild an equal article without validation"
+    article_cache.set(journal_path, article, *source(journal_path))
+    cached = article_cache.get(journal_path)
+
+    assert article_cache.hits == 1, msg
+    assert cached == article, msg
+    assert [type(i) for i in cached.items] == \
+        [type(i) for i in article.items], msg
+
+
+def test_article_cache_touched_file(article_cache, journal_path, article):
+    msg = "should hit by content hash when only the mtime changed"
+    article_cache.set(journal_path, article, *source(journal_path))
+    os.utime(journal_path, ns=(0, 0))
+
+    assert article_cache.get(journal_path) == article, msg
+
+
+def test_article_cache_changed_file(article_cache, journal_path, article):
+    article_cache.set(journal_path, article, *source(journal_path))
+
+    with open(journal_path, "a") as f:
+        f.write("\n")
+
+    assert article_cache.get(journal_path) is None \
+        and article_cache.misses == 1
+
+
+def test_article_cache_edited_while_parsing(article_cache, journal_path,
+                                            article):
+    msg = "should not serve an article parsed from an older version"
+    stamp, digest = source(journal_path)
+
+    with open(journal_path, "a") as f:
+        f.write("\n")
+
+    article_cache.set(journal_path, article, stamp, digest)
+
+    assert article_cache.get(journal_path) is None, msg
+
+
+def test_article_cache_missing_file(tmp_path, valid_journal_root):
+    msg = "should miss when a file the article references is gone"
+    journal_path = os.path.join(dir, "fixtures", "valid.journal")
+    cache = ArticleCache(str(tmp_path / "articles"))
+
+    with open(journal_path) as f:
+        article, _ = next(parse(f))
+
+    cache.set(journal_path, article, *source(journal_path))
+    os.remove(os.path.join(valid_journal_root,
+                           "interactive-examples/poll/index.html"))
+    stat_cache.clear()
+    cached = cache.get(journal_path)
+
+    assert cached is None and cache.misses == 1, msg
+
+
+def test_replace_if_changed_skips_unchanged(tmp_path, monkeypatch):
+    msg = "should not write anything when the page is unchanged"
+    path = str(tmp_path / "page.html")
+    assert replace_if_changed(path, ["<p>", "a", "</p>"])
+
+    modes = []
+
+    def spy(file, mode="r", *args, **kwargs):
+        modes.append(mode)
+        return open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(buildcache, "open", spy, raising=False)
+
+    assert not replace_if_changed(path, ["<p>a", "</p>"]), msg
+    assert modes == ["rb"], msg
+    assert replace_if_changed(path, ["<p>b</p>"])
+    assert read(path) == "<p>b</p>" and os.listdir(str(tmp_path)) == \
+        ["page.html"]
+
+
+def test_keyword_cache(tmp_path):
+    cache = KeywordCache(str(tmp_path))
+    cache.set("some python python river", [("python", 2)])
+
+    assert cache.get("some python python river") == [("python", 2)] \
+        and cache.get("some python river") is None
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+def source(path):
+    return file_stamp(path), file_hash(path)
@@ -0,0 +1,521 @@
+import compile
+import json
+import memprofile
+import os
+import pytest
+import seo
+import subprocess
+import sys
+import tracing
+from argparse import Namespace
+from bench.corpus import journal
+from buildcache import ComponentCache, KeywordCache
+from compile import Watcher, parse_documents, render, \
+    set_recommended_keywords, set_related_topics
+from conftest import read_fixture, write
+from render.html import context as context_module, skeleton
+from render.html.context import RenderContext
+from render.html.skeleton import BACKENDS, JOURNAL_JS
+
+dir = os.path.dirname(os.path.abspath(__file__))
+
+FEATURES = {"feedback": True, "journal-like": True,
+            "interactive-example": True, "related-topics": True,
+            "missing-chapters-hint": True, "chapter-index": True,
+            "subscriptions": False
+            }
+
+# python -X importtime, cumulative for compile, warm bytecode cache
+IMPORT_BUDGET_MS = 250
+
+
+###########################################
+############## FIXTURES  ##################
+###########################################
+
+
+@pytest.fixture
+def journal_files(tmp_path):
+    valid = read_fixture("valid.journal")
+    invalid = read_fixture("test.journal")
+
+    paths = []
+    for n, content in enumerate([valid, invalid, valid, invalid, valid]):
+        path = tmp_path / f"journal-{n}.journal"
+        path.write_text(content)
+        # Document expects a path relative to src, like ../journal/*.journal
+        paths.append(os.path.relpath(str(path)))
+
+    return paths
+
+
+@pytest.fixture
+def web_root(tmp_path):
+    root = tmp_path / "web"
+    for path in ["stylesheets/inline/font.css", "fonts/styles.css",
+                 "stylesheets/inline/responsive.css", "js/prod_template.js",
+                 "interactive-examples/poll/index.html", *JOURNAL_JS]:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(path)
+
+    (root / "js" / "dist").mkdir()
+    return str(root)
+
+
+@pytest.fixture
+def watcher(web_root, monkeypatch):
+    journals = os.path.join(web_root, "journal")
+    os.mkdir(journals)
+    write(os.path.join(journals, "valid.journal"),
+          read_fixture("valid.journal"))
+    write(os.path.join(journals, "synthetic.journal"), journal())
+
+    monkeypatch.setattr(seo, "SeoEngine", FakeSeoEngine)
+    args = Namespace(file=None, backend="fast", cache=False, verbose=False,
+                     jobs=1, indent=False)
+
+    return Watcher(args, os.path.join(os.path.relpath(journals), "*.journal"),
+                   os.path.relpath(web_root))
+
+
+@pytest.fixture
+def src_watcher(web_root, valid_journal_root, monkeypatch):
+    # both are tmp_path / "web", the watcher runs in its src directory
+    journals = os.path.join(web_root, "journal")
+    write(os.path.join(journals, "valid.journal"),
+          read_fixture("valid.journal")
+          .replace("interactive-examples/poll", "demos/poll"))
+    write(os.path.join(web_root, "demos/poll/index.html"), "")
+
+    monkeypatch.setattr(seo, "SeoEngine", FakeSeoEngine)
+    args = Namespace(file=None, backend="fast", cache=False, verbose=False,
+                     jobs=1, indent=False)
+
+    return Watcher(args, "../journal/*.journal", web_root)
+
+
+###########################################
+################# TESTS ###################
+###########################################
+
+
+@pytest.mark.parametrize("verbose", [False, True])
+def test_parse_documents_jobs_same_as_serial(journal_files, capsys, verbose):
+    msg = "should return documents and print errors in file order"
+
+    serial, serial_err = parse_documents(
+        journal_files, FEATURES, verbose, jobs=1)
+    serial_out = capsys.readouterr().out
+
+    parallel, parallel_err = parse_documents(
+        journal_files, FEATURES, verbose, jobs=2)
+    parallel_out = capsys.readouterr().out
+
+    assert serial_err and parallel_err
+    assert [d.file_name for d in parallel] == \
+        ["journal-0", "journal-2", "journal-4"], msg
+    assert [d.content for d in parallel] == [d.content for d in serial]
+    assert parallel_out == serial_out, msg
+
+
+def test_parse_documents_verbose_reports_every_error(journal_files, capsys):
+    parse_documents(journal_files, FEATURES, verbose=False, jobs=2)
+    quiet = capsys.readouterr().out.splitlines()
+
+    parse_documents(journal_files, FEATURES, verbose=True, jobs=2)
+    verbose = capsys.readouterr().out.splitlines()
+
+    assert len(verbose) > len(quiet) and \
+        quiet[1] == "Parsing failed: " + journal_files[1]
+
+
+def test_parse_documents_jobs_counts_cache_hits(journal_files, tmp_path):
+    msg = "should count component cache hits and misses of the workers"
+    cache = ComponentCache(str(tmp_path / "components"))
+    parse_documents(journal_files, FEATURES, False, jobs=2,
+                    component_cache=cache)
+    misses = cache.misses
+
+    cache = ComponentCache(str(tmp_path / "components"))
+    parse_documents(journal_files, FEATURES, False, jobs=2,
+                    component_cache=cache)
+
+    assert misses > 0 and cache.hits > 0, msg
+
+
+def test_parse_documents_traced(journal_files, tmp_path, monkeypatch):
+    msg = "should record a span per file, also in worker processes"
+    monkeypatch.setattr(tracing, "_tracer", tracing.NullTracer())
+    tracer = tracing.enable()
+
+    parse_documents(journal_files, FEATURES, False, jobs=2)
+    tracer.save(str(tmp_path / "trace.json"))
+
+    with open(str(tmp_path / "trace.json")) as f:
+        events = json.load(f)["traceEvents"]
+
+    files = [e for e in events if e["name"] == "parse_file"]
+    assert sorted(e["args"]["item"] for e in files) == sorted(journal_files)
+    assert all(e["pid"] != os.getpid() for e in files), msg
+    assert all(e["ph"] == "X" and "cpu_ms" in e["args"] for e in events)
+
+
+def test_memory_profile_reports_stages_and_documents(journal_files, web_root,
+                                                    monkeypatch, capsys):
+    msg = "should report every stage and the page buffer of every document"
+    monkeypatch.setattr(memprofile, "_profile", None)
+    profile = memprofile.enable(top=3)
+
+    docs, _ = parse_documents(journal_files, FEATURES, False)
+    memprofile.checkpoint("parse_documents")
+    context = RenderContext(web_root)
+    context.script_path = "/js/dist/journal.js"
+    render(docs, False, context)
+    memprofile.checkpoint("render")
+
+    profile.stop()
+    profile.report(docs, context)
+    out = capsys.readouterr().out
+
+    assert [s[0] for s in profile.stages] == ["parse_documents", "render"]
+    assert all(0 < len(s[3]) <= 3 for s in profile.stages)
+    assert "page buffer" in out and all(d.path in out for d in docs), msg
+
+
+def test_trace_and_memory_profile_kept_on_parser_error(journal_files, tmp_path,
+                                                       monkeypatch, capsys):
+    msg = "should save the trace and print the memory report before exiting"
+    monkeypatch.setattr(tracing, "_tracer", tracing.NullTracer())
+    monkeypatch.setattr(memprofile, "_profile", None)
+    trace = str(tmp_path / "trace.json")
+    args = Namespace(check=None, watch=False, trace=trace, memory_profile=3,
+                     file=journal_files[1], cache=False, verbose=False,
+                     jobs=1)
+
+    with pytest.raises(SystemExit):
+        compile.main(args)
+
+    with open(trace) as f:
+        events = json.load(f)["traceEvents"]
+
+    assert {"build", "parse_file"} <= {e["name"] for e in events}, msg
+    assert "[parse_documents] traced" in capsys.readouterr().out, msg
+
+
+def test_recommended_keywords_served_from_cache(journal_files, tmp_path,
+                                                monkeypatch, capsys):
+    msg = "should not load the nltk models when every document is cached"
+    docs, _ = parse_documents(journal_files, FEATURES, False)
+    cache = KeywordCache(str(tmp_path / "keywords"))
+    set_recommended_keywords(docs, Namespace(verbose=False), cache)
+    expected = [d.recommended_keywords for d in docs]
+
+    monkeypatch.setattr(seo, "SeoEngine", None)
+    set_recommended_keywords(docs, Namespace(verbose=True), cache)
+
+    assert [d.recommended_keywords for d in docs] == expected, msg
+    assert "3 of 3 documents served from cache" in capsys.readouterr().out
+
+
+def test_render_jobs_same_as_serial(journal_files, web_root):
+    msg = "should write byte identical pages"
+    docs, _ = parse_documents(journal_files, FEATURES, False)
+    context = RenderContext(web_root)
+    context.script_path = "/js/dist/journal.js"
+
+    render(docs, False, context, jobs=1)
+    serial = [read_bytes(d.file_path) for d in docs]
+
+    for d in docs:
+        os.remove(d.file_path)
+
+    render(docs, False, context, jobs=2)
+
+    assert [read_bytes(d.file_path) for d in docs] == serial, msg
+    assert not [f for f in os.listdir(os.path.dirname(journal_files[0]))
+                if f.endswith(".tmp")]
+
+
+def test_render_jobs_reads_assets_once(journal_files, web_root, tmp_path,
+                                       monkeypatch):
+    msg = "should read the shared assets once per build, not per worker"
+    docs, _ = parse_documents(journal_files, FEATURES, False)
+    log = str(tmp_path / "opened")
+
+    # forked workers inherit the spy and append to the same log
+    def spy(path, *args, **kwargs):
+        with open(log, "a") as f:
+            f.write(path + "\n")
+        return open(path, *args, **kwargs)
+
+    def reads(jobs):
+        write(log, "")
+        for d in docs:
+            os.remove(d.file_path)
+
+        context = RenderContext(web_root)
+        context.script_path = "/js/dist/journal.js"
+        monkeypatch.setattr(context_module, "open", spy, raising=False)
+        render(docs, False, context, jobs=jobs)
+        monkeypatch.undo()
+
+        with open(log) as f:
+            return sorted(f.read().splitlines())
+
+    render(docs, False, RenderContext(web_root), jobs=1)
+    serial = reads(1)
+
+    assert serial and reads(3) == serial, msg
+
+
+def test_render_skips_unchanged_pages(journal_files, web_root):
+    msg = "should only write and report pages whose content changed"
+    docs, _ = parse_documents(journal_files, FEATURES, False)
+    context = RenderContext(web_root)
+    context.script_path = "/js/dist/journal.js"
+
+    assert render(docs, False, context) == [d.file_path for d in docs]
+
+    os.utime(docs[0].file_path, ns=(0, 0))
+    docs[1].related_topics = [dict(match_index=6, title="Other", href="/")]
+
+    assert render(docs, False, context) == [docs[1].file_path], msg
+    assert os.stat(docs[0].file_path).st_mtime_ns == 0, msg
+
+
+def test_render_indent_only_adds_whitespace(journal_files, web_root):
+    docs, _ = parse_documents(journal_files, FEATURES, False)
+    context = RenderContext(web_root)
+    context.script_path = "/js/dist/journal.js"
+
+    render(docs[:1], False, context)
+    streamed = read_bytes(docs[0].file_path)
+    render(docs[:1], False, context, pretty=True)
+    indented = read_bytes(docs[0].file_path)
+
+    assert len(indented) > len(streamed)
+    assert b"".join(indented.split()) == b"".join(streamed.split())
+
+
+def test_watch_rebuilds_affected_pages(watcher, web_root, monkeypatch):
+    msg = "should only render pages depending on the changed files"
+    rendered = []
+    htmldocument = skeleton.htmldocument
+
+    def spy(document, verbose, context):
+        rendered.append(document.file_name)
+        return htmldocument(document, verbose, context)
+
+    monkeypatch.setattr(skeleton, "htmldocument", spy)
+
+    assert len(watcher.rebuild(watcher.poll())) == 2
+    assert watcher.poll() == []
+
+    rendered.clear()
+    poll = os.path.join(web_root, "interactive-examples/poll/index.html")
+    write(poll, "<p>changed</p>")
+    watcher.rebuild(watcher.poll())
+    assert rendered == ["valid"], msg
+
+    rendered.clear()
+    synthetic = os.path.join(web_root, "journal", "synthetic.journal")
+    write(synthetic, journal(seed=1))
+    pages = watcher.rebuild(watcher.poll())
+    assert rendered == ["synthetic"] and len(pages) == 1, msg
+
+    rendered.clear()
+    write(os.path.join(web_root, "fonts/styles.css"), "changed")
+    watcher.rebuild(watcher.poll())
+    assert sorted(rendered) == ["synthetic", "valid"], msg
+
+
+def test_watch_removes_deleted_pages(watcher, web_root):
+    msg = "should remove the page of a deleted journal"
+    pages = watcher.rebuild(watcher.poll())
+    synthetic = [p for p in pages if "synthetic" in p][0]
+
+    os.remove(os.path.join(web_root, "journal", "synthetic.journal"))
+    assert watcher.rebuild(watcher.poll()) == [synthetic], msg
+    assert not os.path.exists(synthetic), msg
+    assert len(watcher.documents) == 1, msg
+
+
+def test_watch_reparses_on_referenced_file(src_watcher, web_root, capsys):
+    msg = "should parse a journal again when a file it references changes"
+    watcher = src_watcher
+    picture = os.path.join(web_root, "gallery", "raspizero.jpg")
+
+    watcher.rebuild(watcher.poll())
+    assert len(watcher.documents) == 1 and watcher.poll() == []
+
+    os.remove(picture)
+    capsys.readouterr()
+    assert watcher.poll() == [picture], msg
+
+    watcher.rebuild([picture])
+    assert watcher.documents == {}, msg
+    assert "raspizero.jpg" in capsys.readouterr().out, msg
+
+    write(picture, "")
+    watcher.rebuild(watcher.poll())
+    assert len(watcher.documents) == 1, msg
+
+
+def test_watch_example_edited_in_place(src_watcher, web_root):
+    msg = "should render a page again when its example's index.html changes"
+    watcher = src_watcher
+    index = os.path.join(web_root, "demos", "poll", "index.html")
+
+    watcher.rebuild(watcher.poll())
+    assert watcher.poll() == []
+
+    write(index, "<p>changed</p>")
+    assert watcher.poll() == [index], msg
+    assert watcher.rebuild([index]) == [watcher.documents[
+        "../journal/valid.journal"].file_path], msg
+
+
+def test_watch_retries_after_rebuild_error(watcher, monkeypatch, capsys):
+    msg = "should report a failed rebuild and retry the same changes"
+    watcher.args.watch_interval = 0
+    calls, sleeps = [], []
+    rebuild = watcher.rebuild
+
+    def flaky(changed):
+        calls.append(changed)
+        if len(calls) == 1:
+            raise FileNotFoundError("journal replaced while parsing")
+        return rebuild(changed)
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(watcher, "rebuild", flaky)
+    monkeypatch.setattr(compile, "sleep", sleep)
+    watcher.run()
+
+    assert len(calls) == 2 and calls[0] == calls[1], msg
+    assert "Rebuild failed" in capsys.readouterr().out, msg
+    assert len(watcher.documents) == 2, msg
+
+
+def test_related_topics_same_as_all_pairs():
+    from bench.related import corpus, set_related_topics_all_pairs
+
+    msg = "should find the same related topics in the same order"
+    before, after = corpus(300), corpus(300)
+    set_related_topics_all_pairs(before, False)
+    set_related_topics(after, False)
+
+    assert any(d.related_topics for d in after)
+    assert [d.related_topics for d in after] == \
+        [d.related_topics for d in before], msg
+
+
+def test_import_within_budget(tmp_path):
+    msg = f"should import compile in less than {IMPORT_BUDGET_MS} ms"
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=str(tmp_path))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    command = [sys.executable, "-W", "ignore", "-X", "importtime", "-c",
+               "import compile, sys; print(' '.join(sys.modules))"]
+
+    runs = [subprocess.run(command, cwd=dir, env=env, capture_output=True,
+                           text=True, check=True) for _ in range(4)]
+    modules = runs[-1].stdout.split()
+    # the first run only fills the bytecode cache
+    import_ms = min(import_time(r.stderr, "compile") for r in runs[1:]) / 1000
+
+    assert not {"nltk", "numpy", "yattag"} & set(modules)
+    assert import_ms < IMPORT_BUDGET_MS, msg
+    assert sorted(BACKENDS) == sorted(compile.BACKEND_NAMES)
+
+
+def test_check_prints_errors_as_json_lines(tmp_path):
+    msg = "should print one JSON object per error, without nltk or yattag"
+    invalid = tmp_path / "invalid.journal"
+    invalid.write_text(read_fixture("valid.journal").replace(
+        "date: 2020-03-23", "date: 23.03.2020"))
+
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "compile.py",
+         "--check", os.path.join(dir, "fixtures", "valid.journal"),
+         str(invalid)], cwd=dir, capture_output=True, text=True)
+    errors = [json.loads(line) for line in result.stdout.splitlines()]
+
+    assert result.returncode == 1
+    assert [(e["file"], e["line"], e["column"]) for e in errors] == [
+        (str(invalid), 18, 7)], msg
+    assert not [m for m in ("nltk", "numpy", "yattag")
+                if f" {m}\n" in result.stderr], msg
+
+
+def test_check_missing_file(tmp_path, capsys):
+    msg = "should report a missing file as an error at its first line"
+    missing = str(tmp_path / "missing.journal")
+
+    assert not compile.check_files([missing])
+    error = json.loads(capsys.readouterr().out)
+
+    assert (error["file"], error["line"], error["column"]) == \
+        (missing, 1, 1), msg
+    assert "No such file" in error["message"], msg
+
+
+def test_check_reads_files_from_stdin(tmp_path):
+    msg = "should answer every path with its errors and the error count"
+    valid = os.path.join(dir, "fixtures", "valid.journal")
+    missing = str(tmp_path / "missing.journal")
+
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "compile.py", "--check", "-"],
+        input=f"{valid}\n{missing}\n\n{valid}\n", cwd=dir,
+        capture_output=True, text=True)
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+
+    assert result.returncode == 0
+    assert [(e["file"], e.get("errors")) for e in lines] == [
+        (valid, 0), (missing, None), (missing, 1), (valid, 0)], msg
+
+
+def test_check_stdin_with_files_rejected():
+    msg = "should reject files given along with - instead of checking '-'"
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "compile.py", "--check", "-",
+         os.path.join(dir, "fixtures", "valid.journal")],
+        cwd=dir, capture_output=True, text=True)
+
+    assert result.returncode == 2 and result.stdout == "", msg
+    assert "read from stdin" in result.stderr, msg
+
+
+###########################################
+############## HELPERS ####################
+###########################################
+
+
+class FakeSeoEngine:
+    timings = {}
+
+    def extract_nouns_batch(self, texts):
+        return [["python"] for _ in texts]
+
+    def most_common_words_histogram(self, s):
+        return [(s, 5)]
+
+
+def import_time(importtime, module):
+    # lines like "import time:  self [us] | cumulative | module"
+    for line in importtime.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+
+    raise ValueError(f"{module} not found in -X importtime output")
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
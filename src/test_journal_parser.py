@@ -1,15 +1,21 @@
+from bench.corpus import corpus
+from buildcache import ComponentCache
 import cProfile
+import io
 import json
 from functools import lru_cache
 import os
 import pytest
 import random
 from journalparser import blank, component_identifier, _component_iterator
-from journalparser import _chunk_until_next_component
+from journalparser import _chunk_until_next_component, _lex_components
 from journalparser import drafting, component_type_is, _tokenize_component_properties
-from journalparser import prop_missing_space
-from journalparser import TokenizeComponent, ParseComponent
+from journalparser import classify_paragraph, prop_missing_space
+from journalparser import TokenizeComponent, ParseComponent, check, parse
+from model import Chapter, Introduction, chapter_model, introduction_model
+from model import StatCache, stat_cache
 from pathlib import Path
+from time import perf_counter
 
 dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -214,6 +220,13 @@ def meta_properties_w_duplicate():
     return read_json("meta_properties_w_duplicate.json")
 
 
+@pytest.fixture
+def valid_journal_file():
+    f = open(os.path.join(dir, 'fixtures', "valid.journal"))
+    yield f
+    f.close()
+
+
 @pytest.fixture
 def tc():
     return TokenizeComponent()
@@ -286,6 +299,33 @@ def test_chunk_complete_document(journal_file, journal_chunked):
     assert chunks == journal_chunked, msg
 
 
+def test_lex_complete_document(journal_file, journal_chunked):
+    msg = "should lex the same chunks as _chunk_until_next_component"
+    chunks = list(_lex_components(journal_file))
+    assert chunks == journal_chunked, msg
+
+
+def test_lex_empty_file(empty_file):
+    msg = "should lex no chunks for empty file"
+    assert list(_lex_components(empty_file)) == [], msg
+
+
+def test_lex_empty_components(empty_components_file):
+    chunks = list(_lex_components(empty_components_file))
+    assert chunks == [["/meta\n"], ["/introduction"]]
+
+
+def test_lex_stop_when_drafting_occurs(drafting_file, drafting_expected):
+    msg = "should not lex beyond a line with three dashes"
+    chunks = list(_lex_components(drafting_file))
+    assert chunks == [drafting_expected], msg
+
+
+def test_component_iterator_is_single_pass(journal_file, journal_chunked):
+    chunks = list(_component_iterator(journal_file))
+    assert chunks == journal_chunked
+
+
 def test_component_type(journal_chunked):
     is_meta = component_type_is("meta", journal_chunked[0])
     assert is_meta == True
@@ -394,6 +434,19 @@ def test_tokenize_component_chapter(tc, chapter_chunked, chapter_tokenized):
     assert err is None and chapter == chapter_tokenized
 
 
+@pytest.mark.parametrize("content, expected", [
+    ("Plain text - [x] later", ("text", None)),
+    ("Note: So I created my own format. Note: twice",
+     ("note", " So I created my own format.  twice")),
+    ("- [ ] Gallery support", ("checkbox", " Gallery support")),
+    ("- [x] A chapter appendix", ("checked", " A chapter appendix")),
+    ("- [done] Quote support", ("bracket", " Quote support")),
+    ("- [x] first] second", ("checked", " first] second")),
+])
+def test_classify_paragraph(content, expected):
+    assert classify_paragraph(content) == expected
+
+
 def test_tokenize_invalid_appendix(tc):
     err_msg = ("Error in /chapter properties: "
                "ensure this value has valid syntax: \""
@@ -1180,6 +1233,19 @@ def test_parse_component_chapter_opt_interactive_example_dir_is_file(pc):
     assert err == err_msg and chapter is None
 
 
+def test_parse_component_chapter_opt_interactive_example_no_index(pc):
+    path = Path("../gallery/index.html")
+    err_msg = (f"Error in /chapter: path \"{path}\" does not point"
+               " to a file: \"interactive-example: gallery (len=7)\"")
+    chapter, err = pc.parse_component_chapter({
+        "author": "Robin Gruenke",
+        "topic": "Preface: What about Elm ?",
+        "date": "2020-12-29",
+        "interactive_example": "gallery"
+    })
+    assert err == err_msg and chapter is None
+
+
 def test_parse_component_chapter_opt_gallery_height_shortness(pc):
     err_msg = ("Error in /chapter: ensure this value has at least 3 characters:"
                " \"gallery->height: px (len=2)\"")
@@ -1388,6 +1454,175 @@ def test_parse_component_chapter_all_fields(pc, chapter_tokenized):
 # test valid token for parse chapter
 
 
+def test_chapter_model_is_built_once():
+    m = chapter_model(appendix_filepath=True, picture_url=True)
+    m2 = chapter_model(True, False, True)
+    assert m is m2 and issubclass(m, Chapter) and m is not Chapter
+
+
+def test_chapter_model_variants():
+    variants = {chapter_model(a, g, p)
+                for a in (False, True)
+                for g in (False, True)
+                for p in (False, True)}
+    assert len(variants) == 8 and chapter_model() is Chapter
+
+
+def test_introduction_model_variants():
+    m = introduction_model(appendix_filepath=True)
+    assert m is introduction_model(True) \
+        and m is not Introduction \
+        and introduction_model() is Introduction
+
+
+def test_parse_valid_journal(valid_journal_file):
+    results = list(parse(valid_journal_file))
+    article, err = results[0]
+    assert len(results) == 1 and err is None and len(article.items) == 2
+
+
+def test_parse_synthetic_corpus(tmp_path):
+    msg = "should generate valid journals with galleries, quotes and code"
+    paths = corpus(str(tmp_path), articles=10)
+    chapters = []
+
+    for path in paths:
+        with open(path) as f:
+            results = list(parse(f))
+
+        assert [err for _, err in results] == [None], msg
+        chapters += results[0][0].items
+
+    assert all(any(getattr(c, a) for c in chapters)
+               for a in ("gallery", "quote", "picture")), msg
+    assert any(p.kind == "code" for c in chapters for p in c.paragraphs), msg
+
+
+def test_check_reports_line_and_column(valid_journal_file):
+    msg = "should point at the property of every invalid component"
+    journal = valid_journal_file.read() \
+        .replace("date: 2020-03-23", "date: 23.03.2020") \
+        .replace("picture: 1000px", "picture: huge")
+
+    errors = list(check(io.StringIO(journal)))
+
+    assert [e[:2] for e in errors] == [(18, 7), (38, 10)], msg
+    assert "invalid date format" in errors[0][2]
+    assert "\"picture\", like this" in errors[1][2]
+    assert list(check(io.StringIO(""))) == [
+        (1, 1, "Error: First component expected to be /meta component")]
+
+
+def test_check_missing_component_on_last_line():
+    msg = "should report a missing component on the last line of the file"
+    errors = list(check(io.StringIO("/meta\ntitle: x\n")))
+
+    assert errors[-1] == (
+        2, 1, "Error: Second component expected to be /introduction component"
+    ), msg
+
+
+def test_check_within_latency_target():
+    from bench.check import TARGET_MS
+
+    msg = f"should check the largest fixture in less than {TARGET_MS} ms"
+    timings = []
+
+    for _ in range(3):
+        with open(os.path.join(dir, "fixtures", "test.journal")) as f:
+            start = perf_counter()
+            list(check(f))
+            timings.append(perf_counter() - start)
+
+    assert min(timings) * 1000 < TARGET_MS, msg
+
+
+def test_parse_with_component_cache(tmp_path, valid_journal_file):
+    msg = "should validate each component once and reuse it afterwards"
+    cache = ComponentCache(str(tmp_path))
+
+    first, _ = next(parse(valid_journal_file, cache=cache))
+    valid_journal_file.seek(0)
+    second, _ = next(parse(valid_journal_file, cache=cache))
+
+    assert cache.misses == 4 and cache.hits == 4, msg
+    assert first == second and \
+        type(first.items[1]) is type(second.items[1])
+
+
+def test_parse_with_component_cache_changed_chunk(tmp_path,
+                                                  valid_journal_file):
+    cache = ComponentCache(str(tmp_path))
+    next(parse(valid_journal_file, cache=cache))
+    valid_journal_file.seek(0)
+    content = valid_journal_file.read().replace("Cool,", "Nice,")
+
+    article, _ = next(parse(io.StringIO(content), cache=cache))
+
+    assert cache.hits == 3 and \
+        article.items[1].paragraphs[-1].content.startswith("Nice,")
+
+
+def test_parse_with_component_cache_missing_file(
+        tmp_path, valid_journal_root, valid_journal_file):
+    msg = "should validate a cached component again when its file is gone"
+    content = valid_journal_file.read()
+    cache = ComponentCache(str(tmp_path / "cache"))
+
+    article, err = next(parse(io.StringIO(content), cache=cache))
+    assert err is None
+
+    os.remove(os.path.join(valid_journal_root, "gallery/sample.jpg"))
+    stat_cache.clear()
+    results = list(parse(io.StringIO(content), cache=cache))
+
+    assert results and all(r is None for r, _ in results), msg
+    assert all("does not exist" in err for _, err in results), msg
+
+
+def test_stat_cache_kinds(tmp_path):
+    (tmp_path / "gallery").mkdir()
+    (tmp_path / "gallery" / "img.png").write_text("")
+    sc = StatCache()
+
+    assert sc.kind(str(tmp_path / "gallery")) == StatCache.DIR \
+        and sc.kind(str(tmp_path / "gallery" / "img.png")) == StatCache.FILE \
+        and sc.kind(str(tmp_path / "gallery" / "nope.png")) is None \
+        and sc.kind(str(tmp_path / "gallery" / "img.png" / "x")) is None
+
+
+def test_stat_cache_lists_each_directory_once(tmp_path, monkeypatch):
+    (tmp_path / "a.png").write_text("")
+    (tmp_path / "b.png").write_text("")
+    sc = StatCache()
+    sc.kind(str(tmp_path / "a.png"))
+    monkeypatch.setattr(os, "scandir", None)
+
+    assert sc.kind(str(tmp_path / "b.png")) == StatCache.FILE
+
+
+def test_stat_cache_clear(tmp_path):
+    sc = StatCache()
+    assert sc.kind(str(tmp_path / "new.png")) is None
+
+    (tmp_path / "new.png").write_text("")
+    assert sc.kind(str(tmp_path / "new.png")) is None
+
+    sc.clear()
+    assert sc.kind(str(tmp_path / "new.png")) == StatCache.FILE
+
+
+def test_stat_cache_warm(tmp_path, monkeypatch):
+    (tmp_path / "gallery" / "2021").mkdir(parents=True)
+    (tmp_path / "gallery" / "2021" / "img.png").write_text("")
+    sc = StatCache()
+    sc.warm(str(tmp_path))
+    monkeypatch.setattr(os, "scandir", None)
+
+    assert sc.kind(str(tmp_path / "gallery" / "2021" / "img.png")) \
+        == StatCache.FILE
+
+
 ###########################################
 ############## HELPERS ####################
 ###########################################
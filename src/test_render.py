@@ -0,0 +1,255 @@
+import glob
+import os
+import pytest
+from bench.corpus import journal
+from compile import Document
+from conftest import read, read_fixture, write
+from io import StringIO
+from journalparser import parse
+from render.html import fragments, skeleton
+from render.html.context import RenderContext
+from render.html.gallery import rows
+from render.html.skeleton import BACKENDS, assetpipeline, htmldocument
+from yattag import Doc
+
+dir = os.path.dirname(os.path.abspath(__file__))
+
+FEATURES = {"feedback": True, "journal-like": True,
+            "interactive-example": True, "related-topics": True,
+            "missing-chapters-hint": True, "chapter-index": True,
+            "subscriptions": True
+            }
+
+NO_FEATURES = {feature: False for feature in FEATURES}
+
+POLL = "interactive-examples/poll/index.html"
+
+###########################################
+############## FIXTURES  ##################
+###########################################
+
+
+@pytest.fixture
+def web_root(tmp_path):
+    files = {"stylesheets/inline/font.css": "font",
+             "stylesheets/inline/responsive.css": "responsive",
+             "stylesheets/inline/critical/a.css": "critical",
+             "fonts/styles.css": "icons",
+             POLL: read(os.path.join(dir, os.pardir, POLL))}
+
+    for path, content in files.items():
+        write(tmp_path / path, content)
+
+    return tmp_path
+
+
+def fixture_journals():
+    journals = []
+
+    for path in sorted(glob.glob(os.path.join(dir, "fixtures", "*.journal"))):
+        with open(path) as f:
+            text = f.read()
+
+        results = list(parse(StringIO(text)))
+        if results and all(err is None for _, err in results):
+            name = os.path.basename(path).split(".")[0]
+            journals.append(pytest.param(name, text, id=name))
+
+    assert journals
+    return journals + [pytest.param(f"synthetic-{seed}", journal(seed=seed),
+                                    id=f"synthetic-{seed}")
+                       for seed in range(3)]
+
+
+@pytest.fixture
+def render_context(web_root, monkeypatch):
+    # pages carry the current year, golden pages are rendered in 2021
+    monkeypatch.setattr(skeleton, "copyright",
+                        lambda data: f"Copyright {data.meta.year}-2021")
+    context = RenderContext(str(web_root))
+    context.script_path = "/js/dist/journal.js"
+    return context
+
+
+###########################################
+################# TESTS ###################
+###########################################
+
+
+def test_inline_css(web_root):
+    context = RenderContext(str(web_root))
+
+    assert context.inline_css("a", False) == \
+        "\nfont\n\nicons\n\ncritical\n\nresponsive"
+
+
+def test_inline_css_without_critical_css(web_root, capsys):
+    msg = "should leave the critical css out and warn when verbose"
+    context = RenderContext(str(web_root))
+
+    assert context.inline_css("b", True) == \
+        "\nfont\n\nicons\n\n\n\nresponsive", msg
+    assert "Critical CSS File not found: b.css" in capsys.readouterr().out
+
+
+def test_shared_assets_read_once(web_root):
+    msg = "should reuse shared css until refreshed after a change"
+    context = RenderContext(str(web_root))
+    context.inline_css("a", False)
+
+    font = web_root / "stylesheets/inline/font.css"
+    write(font, "new font")
+    assert context.inline_css("a", False).startswith("\nfont\n"), msg
+
+    os.utime(str(font), ns=(0, 0))
+    assert context.refresh() == ["stylesheets/inline/font.css"], msg
+    assert context.refresh() == [], msg
+    assert context.inline_css("a", False).startswith("\nnew font\n"), msg
+
+
+def test_assetpipeline_content_hashed(web_root):
+    msg = "should name the bundle by content and skip unchanged writes"
+    write(web_root / "js/prod_template.js", "(function(){\n//{modules}\n})();")
+    write(web_root / "js/a.js", "a();")
+    (web_root / "js/dist").mkdir()
+
+    path = assetpipeline("journal.js", "js/a.js",
+                         context=RenderContext(str(web_root)))
+    bundle = web_root / path.lstrip("/")
+    os.utime(str(bundle), ns=(0, 0))
+
+    assert path.startswith("/js/dist/journal.") and path.endswith(".js")
+    assert "a();" in bundle.read_text()
+    assert assetpipeline("journal.js", "js/a.js",
+                         context=RenderContext(str(web_root))) == path, msg
+    assert bundle.stat().st_mtime_ns == 0, msg
+
+
+def test_assetpipeline_replaces_truncated_bundle(web_root):
+    msg = "should write the bundle again when its content does not match"
+    write(web_root / "js/prod_template.js", "(function(){\n//{modules}\n})();")
+    write(web_root / "js/a.js", "a();")
+    (web_root / "js/dist").mkdir()
+    context = RenderContext(str(web_root))
+
+    bundle = web_root / assetpipeline(
+        "journal.js", "js/a.js", context=context).lstrip("/")
+    content = bundle.read_text()
+    write(bundle, content[:10])
+    assetpipeline("journal.js", "js/a.js", context=context)
+
+    assert bundle.read_text() == content, msg
+    assert not list((web_root / "js/dist").glob("*.tmp"))
+
+
+def test_assetpipeline_removes_replaced_bundles(web_root):
+    msg = "should only keep the bundle of the current content"
+    write(web_root / "js/prod_template.js", "(function(){\n//{modules}\n})();")
+    write(web_root / "js/a.js", "a();")
+    write(web_root / "js/dist/other.0123456789ab.js", "")
+
+    assetpipeline("journal.js", "js/a.js",
+                  context=RenderContext(str(web_root)))
+    write(web_root / "js/a.js", "b();")
+    path = assetpipeline("journal.js", "js/a.js",
+                         context=RenderContext(str(web_root)))
+
+    assert sorted(os.listdir(str(web_root / "js/dist"))) == sorted(
+        [os.path.basename(path), "other.0123456789ab.js"]), msg
+
+
+@pytest.mark.parametrize("fragment", [
+    fragments.HEAD, fragments.HOME_FOOTER, fragments.FEEDBACK_BUTTON,
+    fragments.FEEDBACK_FORM, fragments.LIKE, fragments.NEW_CHAPTER_HINT])
+def test_fragment_same_as_yattag(fragment):
+    msg = "should render and escape slots exactly like yattag"
+    values = {name: f'{name} <"a" & \'b\'>' for name in fragment.slots}
+    doc = Doc()
+    fragment.build(doc, **values)
+
+    assert fragment.render(**values) == doc.getvalue(), msg
+
+
+@pytest.mark.parametrize("features", [FEATURES, NO_FEATURES])
+@pytest.mark.parametrize("name, text", fixture_journals())
+def test_backends_same_html(render_context, name, text, features):
+    msg = "should build byte identical pages with every backend"
+    document = Document(f"../journal/fixtures/{name}.journal", features,
+                        article(text))
+    document.related_topics = [
+        dict(match_index=7, title="Other <topic>", href="/other.html")]
+
+    pages = {}
+    for backend in BACKENDS:
+        render_context.backend = backend
+        pages[backend] = htmldocument(document, False, render_context)\
+            .getvalue()
+
+    assert pages["fast"] == pages["yattag"], msg
+
+
+def test_interactive_example_dependents(web_root):
+    msg = "should render again only the pages embedding a changed example"
+    text = read_fixture("valid.journal")
+    embedding = Document("../journal/a.journal", FEATURES, article(text))
+    other = Document("../journal/b.journal", FEATURES,
+                     article(journal(seed=0)))
+    documents = [embedding, other]
+    context = RenderContext(str(web_root))
+
+    assert context.affected(documents, [POLL]) == [embedding], msg
+    assert context.affected(documents, ["fonts/styles.css"]) == documents
+
+
+@pytest.mark.parametrize("items, expected", [
+    ([], []),
+    ([1, 2, 3], [[1, 2, 3]]),
+    ([1, 2, 3, 4], [[1, 2, 3], [4]]),
+    ([1, 2, 3, 4, 5, 6, 7, 8], [[1, 2, 3], [4, 5, 6], [7, 8]]),
+])
+def test_gallery_rows(items, expected):
+    assert rows(items) == expected
+
+
+def test_gallery_rows_size():
+    assert rows("abcde", size=2) == ["ab", "cd", "e"]
+
+    with pytest.raises(ValueError):
+        rows("abcde", size=0)
+
+
+def test_gallery_partial_row(render_context):
+    msg = "should render a gallery that is not a multiple of three"
+    text = read_fixture("valid.journal").replace(
+        "gallery: 75px gallery/raspizero.jpg gallery/sample.jpg",
+        "gallery: 75px gallery/raspizero.jpg")
+    document = Document("../journal/fixtures/valid.journal", FEATURES,
+                        article(text))
+    page = htmldocument(document, False, render_context).getvalue()
+
+    assert page.count('class="gallery-container"') == 1, msg
+    assert page.count('class="gallery-picture"') == 2, msg
+
+
+def test_golden_page(render_context):
+    msg = "should match fixtures/valid.html"
+    text = read_fixture("valid.journal")
+    document = Document("../journal/fixtures/valid.journal", FEATURES,
+                        article(text))
+
+    for backend in BACKENDS:
+        render_context.backend = backend
+        page = htmldocument(document, False, render_context).getvalue()
+
+        assert page == read_fixture("valid.html"), msg
+
+
+###########################################
+############## HELPERS ####################
+###########################################
+
+
+def article(text):
+    content, err = next(parse(StringIO(text)))
+    assert err is None
+    return content
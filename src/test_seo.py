@@ -1,4 +1,4 @@
-from seo import extract_nouns, most_common_words_histogram
+from seo import SeoEngine, extract_nouns, most_common_words_histogram
 
 
 def test_extract_nouns():
@@ -14,3 +14,20 @@ def test_word_histogram():
     r = most_common_words_histogram(s)
     expected = [("some", 3), ("python", 2), ("river", 1)]
     assert r == expected
+
+
+def test_engine_batch_same_as_single_documents():
+    texts = [("A python is going to speak to other pythons at Liverpool"
+              " while other pythons are swimming in the river [ ]."),
+             "The parser validates every chapter of the journal."]
+    engine = SeoEngine()
+    expected = [most_common_words_histogram(" ".join(extract_nouns(s)))
+                for s in texts]
+    assert engine.recommended_keywords(texts) == expected
+
+
+def test_engine_timings():
+    engine = SeoEngine()
+    engine.recommended_keywords(["some python python river"])
+    assert set(engine.timings) == {"load", "tokenize", "tag", "histogram"} \
+        and all(t > 0 for t in engine.timings.values())
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+from time import process_time, time_ns
+from typing import Any, Callable, Dict, Iterable, List
+
+
+# Chrome trace events, wall clock timestamps line up spans of workers
+class Tracer:
+    enabled = True
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+
+    def map(self, ex, fn: Callable, items: Iterable, name: str):
+        # one span per item, recorded inside the workers
+        for value, events in ex.map(_Traced(fn, name), items):
+            self.events += events
+            yield value
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events,
+                       "displayTimeUnit": "ms"}, f)
+
+    def span(self, name: str, **args):
+        return _Span(self.events, name, args)
+
+
+class NullTracer:
+    enabled = False
+
+    def map(self, ex, fn, items, name):
+        return ex.map(fn, items)
+
+    def span(self, name, **args):
+        return _NULL_SPAN
+
+
+def enable() -> Tracer:
+    global _tracer
+
+    _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, **args):
+    return _tracer.span(name, **args)
+
+
+def traced_map(ex, fn: Callable, items: Iterable, name: str):
+    return _tracer.map(ex, fn, items, name)
+
+
+###########################################
+################# HELPERS #################
+###########################################
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+_tracer = NullTracer()
+
+
+class _Span:
+    __slots__ = ("_events", "_name", "_args", "_ts", "_cpu")
+
+    def __init__(self, events, name, args):
+        self._events = events
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        self._cpu = process_time()
+        self._ts = time_ns() // 1000
+        return self
+
+    def __exit__(self, *exc):
+        dur = time_ns() // 1000 - self._ts
+        args = self._args
+        args["cpu_ms"] = round((process_time() - self._cpu) * 1000, 3)
+
+        self._events.append({
+            "name": self._name, "cat": "build", "ph": "X",
+            "ts": self._ts, "dur": dur, "pid": os.getpid(),
+            "tid": threading.get_ident(), "args": args})
+
+        return False
+
+
+class _Traced:
+    def __init__(self, fn, name):
+        self.fn = fn
+        self.name = name
+
+    def __call__(self, item):
+        events = []
+
+        with _Span(events, self.name, {"item": _describe(item)}):
+            value = self.fn(item)
+
+        return value, events
+
+
+def _describe(item) -> str:
+    return getattr(item, "path", None) or str(item)